@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark FileCMD archive engines against the 7z subprocess path
+
+Two workloads: many small files and a few large files of synthetic
+tweets. Every engine zips the same folder with one worker so that the
+per-file cost is visible.
+
+Usage:
+    python benchmarks/benchmark_archive.py [n_small] [n_large] [large_mb]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import tempfile
+from spike.DataTools import FileCMD
+from spike.DataTools.FileCMD import zstandard
+from benchmark_raw_stream import make_line
+
+## Define functions -----------------------------------------------------------
+def make_folder(folder, n_files, file_bytes):
+    os.makedirs(folder)
+    lines = b''.join([make_line(i) + b'\n' for i in range(2000)])
+    content = lines * (file_bytes // len(lines) + 1)
+    for i in range(n_files):
+        with open(os.path.join(folder, 'tweets-{:06d}.txt'.format(i)),
+                  'wb') as file:
+            file.write(content[:file_bytes])
+
+
+def run(file_cmd, workload, source_path, output_path, zip_type):
+    os.makedirs(output_path)
+    raw_bytes = sum([os.path.getsize(os.path.join(source_path, x))
+                     for x in os.listdir(source_path)])
+    start = time.perf_counter()
+    results = file_cmd.ZipFolder(source_path, output_path,
+                                 zip_type = zip_type, workers = 1)
+    elapsed = time.perf_counter() - start
+    written = sum([os.path.getsize(os.path.join(output_path, x))
+                   for x in os.listdir(output_path)])
+    print('{:<6} {:<8} {:>8.2f} s {:>8.1f} files/s {:>8.1f} MB/s {:>7.1%} ratio'
+          ' {:>4} failed'.format(workload, zip_type, elapsed,
+          len(results) / elapsed, raw_bytes / elapsed / 1e6,
+          written / raw_bytes, list(results.values()).count(False)))
+    shutil.rmtree(output_path)
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_small = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_large = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    large_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    zip_types = ['zip', 'zip_lzma', 'tar.gz', 'tar.xz']
+    if zstandard is not None:
+        zip_types.append('tar.zst')
+    if shutil.which('7z'):
+        zip_types.insert(0, '7z')
+    folder = tempfile.mkdtemp()
+    file_cmd = FileCMD()
+    try:
+        make_folder(os.path.join(folder, 'small'), n_small, 4096)
+        make_folder(os.path.join(folder, 'large'), n_large,
+                    large_mb * 1048576)
+        for workload in ['small', 'large']:
+            for zip_type in zip_types:
+                run(file_cmd, workload, os.path.join(folder, workload),
+                    os.path.join(folder, 'output'), zip_type)
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark a retention cleanup with DeleteFile against DeleteFiles
+
+Creates n_objects small objects under a temporary bucket folder, deletes
+a sample of them one call at a time with DeleteFile and the rest with
+batched DeleteFiles. Run it against a local emulator (set
+STORAGE_EMULATOR_HOST) or a scratch bucket (set TOKEN_PATH). A local
+emulator has no network round trip, rtt_ms adds one to every HTTP
+request (0 disables it).
+
+Usage:
+    STORAGE_EMULATOR_HOST=http://localhost:9023 \\
+    python benchmarks/benchmark_batch_delete.py bucket [n_objects] [workers]
+                                                [rtt_ms]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from google.auth.transport.requests import AuthorizedSession
+from spike.DataTools import ConnectGoogleCloudStorage
+
+FOLDER = 'benchmark_batch_delete/'
+
+## Define functions -----------------------------------------------------------
+def create_objects(storage, bucket, file_list):
+    bucket = storage.client.bucket(bucket)
+    with ThreadPoolExecutor(max_workers = 16) as executor:
+        list(executor.map(lambda x: bucket.blob(FOLDER + x)
+                          .upload_from_string(b'x'), file_list))
+
+
+def add_rtt(rtt_ms):
+    # every client (DeleteFiles runs one per thread) sends its requests
+    # through an AuthorizedSession
+    request = AuthorizedSession.request
+
+    def delayed(self, *args, **kwargs):
+        time.sleep(rtt_ms / 1000)
+        return(request(self, *args, **kwargs))
+
+    AuthorizedSession.request = delayed
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    bucket = sys.argv[1]
+    n_objects = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+    storage = ConnectGoogleCloudStorage(os.environ.get('TOKEN_PATH'))
+    file_list = ['tweets-{:06d}.json.gz'.format(i) for i in range(n_objects)]
+    create_objects(storage, bucket, file_list)
+    if rtt_ms:
+        add_rtt(rtt_ms)
+    sample = file_list[:min(500, n_objects // 10)]
+    start = time.perf_counter()
+    for file_name in sample:
+        storage.DeleteFile(bucket, file_name, FOLDER)
+    sequential = len(sample) / (time.perf_counter() - start)
+    rest = file_list[len(sample):]
+    start = time.perf_counter()
+    results = storage.DeleteFiles(bucket, rest, FOLDER, workers = workers)
+    elapsed = time.perf_counter() - start
+    print('DeleteFile:  {:>10.1f} objects/s ({} objects, est. {:.1f} s '
+          'for {})'.format(sequential, len(sample), n_objects / sequential,
+                           n_objects))
+    print('DeleteFiles: {:>10.1f} objects/s ({} objects in {:.1f} s, '
+          '{} failed)'.format(len(rest) / elapsed, len(rest), elapsed,
+                              list(results.values()).count(False)))
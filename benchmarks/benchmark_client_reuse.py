@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the per-pass setup of SyncFolderToCloudStorage
+
+Old pass: a new ConnectGoogleCloudStorage (credentials, client, new
+connections) before the requests of the pass. New pass: one long-lived
+object for every pass. Each pass lists the bucket folder and uploads a
+small file from upload_workers threads. Run it against a scratch bucket
+(set TOKEN_PATH) to include TLS handshakes and token requests, or a
+local emulator (set STORAGE_EMULATOR_HOST).
+
+Usage:
+    TOKEN_PATH=token.json \\
+    python benchmarks/benchmark_client_reuse.py bucket [n_passes] [upload_workers]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from spike.DataTools import ConnectGoogleCloudStorage
+
+FOLDER = 'benchmark_client_reuse'
+
+## Define functions -----------------------------------------------------------
+def run_pass(storage, bucket, folder, upload_workers):
+    storage.ListFiles(bucket, FOLDER)
+    with ThreadPoolExecutor(max_workers = upload_workers) as executor:
+        list(executor.map(lambda x: storage.UploadFile(bucket, folder, x,
+                                                       FOLDER),
+                          ['{}.txt'.format(i) for i in range(upload_workers)]))
+
+
+def measure(label, n_passes, new_storage, bucket, folder, upload_workers):
+    storage = None
+    start = time.perf_counter()
+    for _ in range(n_passes):
+        if new_storage or storage is None:
+            storage = ConnectGoogleCloudStorage(os.environ.get('TOKEN_PATH'),
+                                                pool_size = upload_workers)
+        run_pass(storage, bucket, folder, upload_workers)
+    elapsed = (time.perf_counter() - start) / n_passes
+    stats = storage.ConnectionStats()
+    print('{:<12} {:>8.1f} ms/pass, last object: {} connections for {} '
+          'requests ({:.0%} reused)'.format(label, elapsed * 1000,
+                                           stats['connections'],
+                                           stats['requests'],
+                                           stats['reuse']))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    bucket = sys.argv[1]
+    n_passes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    upload_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    folder = tempfile.mkdtemp() + '/'
+    try:
+        for i in range(upload_workers):
+            with open(folder + '{}.txt'.format(i), 'w') as file:
+                file.write('x' * 1024)
+        measure('new client', n_passes, True, bucket, folder, upload_workers)
+        measure('long-lived', n_passes, False, bucket, folder, upload_workers)
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark single-stream against parallel composite uploads
+
+Uploads one large random file with ConnectGoogleCloudStorage.UploadFile:
+one request, resumable chunks, and composite uploads with more and more
+parts. Without a real bucket, point STORAGE_EMULATOR_HOST at a local
+emulator. A local emulator is not limited by the network, so
+stream_mbps throttles each request body to that rate to stand in for the
+per-connection limit of a real uplink (0 disables it).
+
+Usage:
+    STORAGE_EMULATOR_HOST=http://localhost:9023 \\
+    python benchmarks/benchmark_composite_upload.py bucket [size_mb] [stream_mbps]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import tempfile
+from spike.DataTools import ConnectGoogleCloudStorage
+
+## Define functions -----------------------------------------------------------
+def throttle(storage, stream_mbps):
+    # sleep as long as sending the request body would take on a link of
+    # stream_mbps, the sleeps of concurrent requests overlap
+    request = storage.client._http.request
+
+    def throttled(method, url, data = None, **kwargs):
+        if isinstance(data, bytes):
+            time.sleep(len(data) * 8 / (stream_mbps * 1e6))
+        return(request(method, url, data = data, **kwargs))
+
+    storage.client._http.request = throttled
+
+
+def run(storage, bucket, folder, label, **kwargs):
+    size = os.path.getsize(folder + 'upload.bin')
+    start = time.perf_counter()
+    storage.UploadFile(bucket, folder, 'upload.bin', 'benchmark', **kwargs)
+    elapsed = time.perf_counter() - start
+    print('{:<16} {:>8.2f} s {:>10.1f} MB/s'.format(label, elapsed,
+                                                    size / elapsed / 1e6))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    bucket = sys.argv[1]
+    size_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    stream_mbps = float(sys.argv[3]) if len(sys.argv) > 3 else 200
+    storage = ConnectGoogleCloudStorage(os.environ.get('TOKEN_PATH'))
+    if stream_mbps:
+        throttle(storage, stream_mbps)
+    folder = tempfile.mkdtemp() + '/'
+    try:
+        with open(folder + 'upload.bin', 'wb') as file:
+            for _ in range(size_mb):
+                file.write(os.urandom(1048576))
+        run(storage, bucket, folder, 'one request')
+        run(storage, bucket, folder, 'resumable 8 MB', chunk_mb = 8)
+        for parts in [2, 4, 8, 16]:
+            run(storage, bucket, folder, 'composite x' + str(parts),
+                composite_mb = 1, composite_parts = parts)
+        storage.DeleteFile(bucket, 'upload.bin', 'benchmark')
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark inline output compression of the tweet outlet
+
+Streams a recorded tweet corpus through each codec/level with the
+outlet code (ConnectTwitterAPI._append_tweets and _rotate_file in raw
+NDJSON mode, which write through _open_output/_close_output) and reports
+throughput and disk IO. The last rows estimate the old path: write plain
+JSON, read it back and write a 7z archive (when 7z is installed).
+
+Usage:
+    python benchmarks/benchmark_compression.py [corpus.ndjson] [n_tweets]
+    (a synthetic corpus is used when no file is given)
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+from spike.TwitterMonitor import ConnectTwitterAPI
+from benchmark_raw_stream import make_line
+
+## Define functions -----------------------------------------------------------
+def load_corpus(corpus_path, n_tweets):
+    if corpus_path:
+        with open(corpus_path, 'rb') as file:
+            return([x for x in file.read().split(b'\n') if x][:n_tweets])
+    return([make_line(i) for i in range(n_tweets)])
+
+
+def run(codec, level, lines, folder, batch_size = 500):
+    # the outlet code: _append_tweets writes each batch through
+    # _open_output, _rotate_file closes it with _close_output
+    twitter_api = ConnectTwitterAPI('key', 'secret', 'token', 'secret')
+    twitter_api.input_dict = {'raw': True,
+                              'file_format': 'ndjson',
+                              'compression': None if codec == 'none' else
+                                             codec,
+                              'keywords': ['covid19'],
+                              'file_prefix': 'benchmark',
+                              'download_path': folder + '/'}
+    if level is not None:
+        twitter_api.input_dict['compression_level'] = level
+    twitter_api.api_type = 'stream_v1'
+    twitter_api.outlet_type = 'local'
+    raw_bytes = sum([len(x) + 1 for x in lines])
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w') # drop the progress messages
+    try:
+        twitter_api._get_ready()
+        start = time.perf_counter()
+        for i in range(0, len(lines), batch_size):
+            twitter_api._append_tweets(lines[i:i + batch_size])
+        twitter_api._rotate_file()
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    output_path = os.path.join(folder, [x for x in os.listdir(folder)
+                                        if x.startswith('benchmark')][0])
+    written = os.path.getsize(output_path)
+    os.remove(output_path)
+    print('{:<6} {:>5} {:>10.1f} MB/s {:>10.1f} MB written {:>7.1%} ratio'
+          .format(codec, str(level or '-'), raw_bytes / elapsed / 1e6,
+                  written / 1e6, written / raw_bytes))
+
+
+def run_7z(lines, folder):
+    plain_path = os.path.join(folder, 'corpus.txt')
+    zip_path = os.path.join(folder, 'corpus.7z')
+    start = time.perf_counter()
+    with open(plain_path, 'wb') as file:
+        file.write(b'\n'.join(lines) + b'\n')
+    subprocess.call(['7z', 'a', zip_path, plain_path],
+                    stdout = subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    plain = os.path.getsize(plain_path)
+    written = plain + os.path.getsize(zip_path)
+    print('{:<6} {:>5} {:>10.1f} MB/s {:>10.1f} MB written {:>7.1%} ratio'
+          ' (+{:.1f} MB read)'.format('7z', '-', plain / elapsed / 1e6,
+          written / 1e6, os.path.getsize(zip_path) / plain, plain / 1e6))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else None
+    n_tweets = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    lines = load_corpus(corpus_path, n_tweets)
+    folder = tempfile.mkdtemp()
+    try:
+        run('none', None, lines, folder)
+        for level in [1, 6, 9]:
+            run('gzip', level, lines, folder)
+        if zstandard is not None:
+            for level in [1, 3, 10, 19]:
+                run('zstd', level, lines, folder)
+        if shutil.which('7z'):
+            run_7z(lines, folder)
+    finally:
+        shutil.rmtree(folder)
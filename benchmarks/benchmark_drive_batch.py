@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark per-file against batched Drive moves and deletes
+
+Runs against a local fake Drive server (fake_drive_server.py) that
+delays every HTTP request by rtt_ms and fails fail_rate of the calls
+with 503. Moves and deletes a sample of n_files files one call at a time
+with MoveFile/DeleteFile and the rest with MoveFiles/DeleteFiles.
+
+Usage:
+    python benchmarks/benchmark_drive_batch.py [n_files] [rtt_ms] [fail_rate]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+from fake_drive_server import FakeDrive
+
+## Define functions -----------------------------------------------------------
+def measure(label, drive, function, n_files):
+    requests = drive.requests
+    start = time.perf_counter()
+    results = function()
+    elapsed = time.perf_counter() - start
+    failed = (list(results.values()).count(False)
+              if isinstance(results, dict) else 0)
+    print('{:<24} {:>10.1f} files/s {:>6} requests {:>4} failed'.format(
+              label, n_files / elapsed, drive.requests - requests, failed))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rtt_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    drive = FakeDrive(rtt_ms = rtt_ms)
+    from_id = drive.AddItem('from', None, folder = True)
+    to_id = drive.AddItem('to', None, folder = True)
+    file_ids = [drive.AddItem('tweets-{:06d}.zip'.format(i), from_id)
+                for i in range(n_files)]
+    os.environ['DRIVE_EMULATOR_HOST'] = 'http://127.0.0.1:{}'.format(
+                                            drive.Start())
+    from spike.DataTools import ConnectGoogleDrive
+    google_drive = ConnectGoogleDrive(None)
+    sample = file_ids[:min(200, n_files // 10)]
+    rest = file_ids[len(sample):]
+    measure('MoveFile', drive,
+            lambda: [google_drive.MoveFile(x, to_id) for x in sample],
+            len(sample))
+    drive.fail_rate = fail_rate
+    measure('MoveFiles', drive,
+            lambda: google_drive.MoveFiles(rest, to_id), len(rest))
+    measure('MoveFiles, old_parents', drive,
+            lambda: google_drive.MoveFiles(rest, from_id, to_id), len(rest))
+    drive.fail_rate = 0
+    measure('DeleteFile', drive,
+            lambda: [google_drive.DeleteFile(x) for x in sample],
+            len(sample))
+    drive.fail_rate = fail_rate
+    measure('DeleteFiles', drive,
+            lambda: google_drive.DeleteFiles(rest), len(rest))
+    print('{} files left in the folders.'.format(len(drive.items) - 2))
+    drive.Stop()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark buffered against streamed Drive downloads
+
+Runs against a local fake Drive server (fake_drive_server.py). Old
+download: MediaIoBaseDownload into an io.BytesIO, then copied to the
+file. New download: ConnectGoogleDrive.DownloadFile, ranged requests of
+chunk_mb streamed to a partial file. Prints the time and the peak memory
+allocated by Python (tracemalloc) of each.
+
+Usage:
+    python benchmarks/benchmark_drive_download.py [size_mb] [chunk_mb]
+"""
+
+## Set environment ------------------------------------------------------------
+import io
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+from googleapiclient.http import MediaIoBaseDownload
+from fake_drive_server import FakeDrive
+
+## Define functions -----------------------------------------------------------
+def old_download(google_drive, download_path, file_name, file_id):
+    request = google_drive.service.files().get_media(fileId = file_id)
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    while done is False:
+        status, done = downloader.next_chunk()
+    fh.seek(0)
+    with open(download_path + file_name, 'wb') as file:
+        shutil.copyfileobj(fh, file)
+
+
+def measure(label, function, size):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<20} {:>8.2f} s {:>8.1f} MB/s {:>8.1f} MB peak'.format(
+              label, elapsed, size / elapsed / 1e6, peak / 1e6))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    chunk_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 32
+    drive = FakeDrive()
+    size = size_mb * 1048576
+    file_id = drive.AddItem('tweets.zip', None, data = os.urandom(size))
+    os.environ['DRIVE_EMULATOR_HOST'] = 'http://127.0.0.1:{}'.format(
+                                            drive.Start())
+    from spike.DataTools import ConnectGoogleDrive
+    google_drive = ConnectGoogleDrive(None)
+    folder = tempfile.mkdtemp() + '/'
+    try:
+        measure('BytesIO', lambda: old_download(google_drive, folder,
+                                                'old.zip', file_id), size)
+        measure('streamed {} MB'.format(chunk_mb),
+                lambda: google_drive.DownloadFile(folder, 'new.zip', file_id,
+                                                  chunk_mb = chunk_mb), size)
+    finally:
+        shutil.rmtree(folder)
+        drive.Stop()
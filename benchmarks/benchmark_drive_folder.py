@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark serial against concurrent UploadFolderToGD/DownloadFolderFromGD
+
+Runs against a local fake Drive server (fake_drive_server.py) that
+delays every HTTP request by rtt_ms. Uploads and downloads a folder of
+n_files files of size_kb with one worker and with workers, then runs the
+upload again to time the skipping of unchanged files.
+
+Usage:
+    python benchmarks/benchmark_drive_folder.py [n_files] [size_kb]
+                                                [workers] [rtt_ms]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import shutil
+import tempfile
+from fake_drive_server import FakeDrive
+
+## Define functions -----------------------------------------------------------
+def measure(label, drive, function):
+    requests = drive.requests
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w') # drop the per-file messages
+    try:
+        summary = function()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print('{:<24} {:>8.2f} s {:>8.1f} MB/s {:>6} files {:>6} skipped '
+          '{:>6} requests'.format(label, summary['seconds'],
+                                  summary['mb_per_sec'], summary['files'],
+                                  summary['skipped'],
+                                  drive.requests - requests))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    size_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 20
+    drive = FakeDrive(rtt_ms = rtt_ms)
+    for name in ['serial', 'concurrent']:
+        drive.AddItem(name, None, folder = True)
+    os.environ['DRIVE_EMULATOR_HOST'] = 'http://127.0.0.1:{}'.format(
+                                            drive.Start())
+    from spike.DataTools import UploadFolderToGD, DownloadFolderFromGD
+    source = tempfile.mkdtemp() + '/'
+    target = tempfile.mkdtemp() + '/'
+    for i in range(n_files):
+        with open(source + 'tweets-{:06d}.zip'.format(i), 'wb') as file:
+            file.write(os.urandom(size_kb * 1024))
+    try:
+        measure('upload, 1 worker', drive,
+                lambda: UploadFolderToGD(None, source, 'serial', 1))
+        measure('upload, {} workers'.format(workers), drive,
+                lambda: UploadFolderToGD(None, source, 'concurrent',
+                                         workers))
+        measure('upload again', drive,
+                lambda: UploadFolderToGD(None, source, 'concurrent',
+                                         workers))
+        measure('download, 1 worker', drive,
+                lambda: DownloadFolderFromGD(None, target + 'serial',
+                                             'serial', 1))
+        measure('download, {} workers'.format(workers), drive,
+                lambda: DownloadFolderFromGD(None, target + 'concurrent',
+                                             'concurrent', workers))
+    finally:
+        shutil.rmtree(source)
+        shutil.rmtree(target)
+        drive.Stop()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark ConnectGoogleDrive.ListItems page sizes and folder fan-out
+
+Runs against a local fake Drive server (fake_drive_server.py) that
+delays every request by rtt_ms. Lists one folder of n_files files with
+the old page size of 10 and with pages of 1000, then lists a tree of
+n_folders sub-folders recursively with one worker and with workers.
+
+Usage:
+    python benchmarks/benchmark_drive_listing.py [n_files] [n_folders]
+                                                 [workers] [rtt_ms]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+from fake_drive_server import FakeDrive
+
+## Define functions -----------------------------------------------------------
+def measure(label, drive, function):
+    requests = drive.requests
+    start = time.perf_counter()
+    n_items = len(function())
+    elapsed = time.perf_counter() - start
+    print('{:<24} {:>8.2f} s {:>8} items {:>6} requests'.format(
+              label, elapsed, n_items, drive.requests - requests))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_folders = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 10
+    drive = FakeDrive(rtt_ms = rtt_ms)
+    flat_id = drive.AddItem('flat', None, folder = True)
+    for i in range(n_files):
+        drive.AddItem('tweets-{:06d}.zip'.format(i), flat_id)
+    tree_id = drive.AddItem('tree', None, folder = True)
+    for i in range(n_folders):
+        folder_id = drive.AddItem('{:03d}'.format(i), tree_id, folder = True)
+        for j in range(n_files // n_folders):
+            drive.AddItem('tweets-{:06d}.zip'.format(j), folder_id)
+    os.environ['DRIVE_EMULATOR_HOST'] = 'http://127.0.0.1:{}'.format(
+                                            drive.Start())
+    from spike.DataTools import ConnectGoogleDrive
+    google_drive = ConnectGoogleDrive(None)
+    measure('flat, pageSize 10', drive,
+            lambda: google_drive.ListItems(None, flat_id, page_size = 10))
+    measure('flat, pageSize 1000', drive,
+            lambda: google_drive.ListItems(None, flat_id))
+    measure('tree, 1 worker', drive,
+            lambda: google_drive.ListItems(None, tree_id, recursive = True,
+                                           workers = 1))
+    measure('tree, {} workers'.format(workers), drive,
+            lambda: google_drive.ListItems(None, tree_id, recursive = True,
+                                           workers = workers))
+    drive.Stop()
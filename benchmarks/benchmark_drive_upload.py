@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark fixed 1 MB resumable uploads against size-aware uploads
+
+Runs against a local fake Drive server (fake_drive_server.py) that
+delays every HTTP request by rtt_ms. Old upload: MediaFileUpload with
+1 MB resumable chunks for every file. New upload:
+ConnectGoogleDrive.UploadFile, one multipart request for small files and
+adaptive chunks for large ones. Uploads n_small files of small_kb and one
+file of large_mb with each.
+
+Usage:
+    python benchmarks/benchmark_drive_upload.py [n_small] [small_kb]
+                                                [large_mb] [rtt_ms]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import tempfile
+from googleapiclient.http import MediaFileUpload
+from fake_drive_server import FakeDrive
+
+## Define functions -----------------------------------------------------------
+def old_upload(google_drive, source_path, parents, file_name):
+    media = MediaFileUpload(source_path + file_name, chunksize = 1048576,
+                            resumable = True)
+    google_drive.service.files().create(
+        body = {'name': file_name, 'parents': [parents]},
+        media_body = media, fields = 'id, name, parents').execute()
+
+
+def measure(label, drive, function, size):
+    requests = drive.requests
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w') # drop the per-file messages
+    try:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print('{:<20} {:>8.2f} s {:>8.1f} MB/s {:>6} requests'.format(
+              label, elapsed, size / elapsed / 1e6,
+              drive.requests - requests))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_small = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    small_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    large_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 256
+    rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 20
+    drive = FakeDrive(rtt_ms = rtt_ms)
+    folder_id = drive.AddItem('uploads', None, folder = True)
+    os.environ['DRIVE_EMULATOR_HOST'] = 'http://127.0.0.1:{}'.format(
+                                            drive.Start())
+    from spike.DataTools import ConnectGoogleDrive
+    google_drive = ConnectGoogleDrive(None)
+    source = tempfile.mkdtemp() + '/'
+    small_files = ['tweets-{:06d}.json'.format(i) for i in range(n_small)]
+    for file_name in small_files:
+        with open(source + file_name, 'wb') as file:
+            file.write(os.urandom(small_kb * 1024))
+    with open(source + 'tweets.zip', 'wb') as file:
+        file.write(os.urandom(large_mb * 1048576))
+    try:
+        for label, upload in [('1 MB resumable', old_upload),
+                              ('size-aware', ConnectGoogleDrive.UploadFile)]:
+            measure('small, ' + label, drive,
+                    lambda: [upload(google_drive, source, folder_id, x)
+                             for x in small_files],
+                    n_small * small_kb * 1024)
+            measure('large, ' + label, drive,
+                    lambda: upload(google_drive, source, folder_id,
+                                   'tweets.zip'),
+                    large_mb * 1048576)
+    finally:
+        shutil.rmtree(source)
+        drive.Stop()
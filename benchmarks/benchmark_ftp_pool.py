@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark serial transfers against the ConnectSFTP session pool
+
+Starts a local pyftpdlib server (plain FTP) that limits every data
+connection to stream_mbps, as the per-connection throughput of a remote
+server would be (pyftpdlib throttles after the first second of data, so
+keep size_mb well above stream_mbps / 8), then uploads and downloads n_files files one by one
+(pool_size 1) and with UploadFiles/DownloadFiles on a pool of sessions.
+
+Usage:
+    python benchmarks/benchmark_ftp_pool.py [n_files] [size_mb] [pool_size]
+                                            [stream_mbps]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler, ThrottledDTPHandler
+from pyftpdlib.servers import FTPServer
+from spike.DataTools import ConnectSFTP
+
+## Define functions -----------------------------------------------------------
+def start_server(root, stream_mbps):
+    authorizer = DummyAuthorizer()
+    authorizer.add_user('user', 'passwd', root, perm = 'elradfmw')
+    dtp_handler = ThrottledDTPHandler
+    dtp_handler.read_limit = int(stream_mbps * 1e6 / 8)
+    dtp_handler.write_limit = int(stream_mbps * 1e6 / 8)
+    handler = FTPHandler
+    handler.authorizer = authorizer
+    handler.dtp_handler = dtp_handler
+    logging.basicConfig(level = logging.WARNING)
+    server = FTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target = server.serve_forever,
+                     kwargs = {'handle_exit': False},
+                     daemon = True).start()
+    return(server, server.address[1])
+
+
+def measure(label, function, n_bytes):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print('{:<22} {:>8.2f} s {:>8.1f} MB/s'.format(label, elapsed,
+                                                   n_bytes / elapsed / 1e6))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    size_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    pool_size = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    stream_mbps = float(sys.argv[4]) if len(sys.argv) > 4 else 16
+    folder = tempfile.mkdtemp() + '/'
+    try:
+        for sub_folder in ['server', 'source', 'download']:
+            os.makedirs(folder + sub_folder)
+        server, port = start_server(folder + 'server', stream_mbps)
+        file_list = ['{:03d}.bin'.format(i) for i in range(n_files)]
+        for file_name in file_list:
+            with open(folder + 'source/' + file_name, 'wb') as file:
+                file.write(os.urandom(int(size_mb * 1048576)))
+        n_bytes = n_files * int(size_mb * 1048576)
+        serial = ConnectSFTP('127.0.0.1', 'user', 'passwd', sftp_port = port,
+                             use_tls = False)
+        pool = ConnectSFTP('127.0.0.1', 'user', 'passwd', sftp_port = port,
+                           pool_size = pool_size, use_tls = False)
+        measure('upload, serial',
+                lambda: [serial.UploadFile('/', folder + 'source', x)
+                         for x in file_list], n_bytes)
+        measure('upload, pool x' + str(pool_size),
+                lambda: pool.UploadFiles('/', folder + 'source', file_list),
+                n_bytes)
+        measure('download, serial',
+                lambda: [serial.DownloadFile('/', folder + 'download', x)
+                         for x in file_list], n_bytes)
+        measure('download, pool x' + str(pool_size),
+                lambda: pool.DownloadFiles('/', folder + 'download',
+                                           file_list), n_bytes)
+        serial.Close()
+        pool.Close()
+        server.close_all()
+    finally:
+        shutil.rmtree(folder)
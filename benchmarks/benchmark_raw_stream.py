@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the CPU cost of the stream hot path with and without raw mode
+
+Drives the shipped ConnectTwitterAPI code with a fake stream response:
+_request_stream_v1 (decoded mode, or _forward_raw_lines in raw mode)
+-> batch transport (each batch is pickled as the pipe would) ->
+_save_file. Decoded mode pays json.loads per line and json.dumps per
+file, raw mode a substring check per line and a bytes join per file.
+
+Usage:
+    python benchmarks/benchmark_raw_stream.py [n_tweets]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import tempfile
+from spike.TwitterMonitor import ConnectTwitterAPI
+
+## Define classes -------------------------------------------------------------
+class FakeResponse:
+    # stands in for the TwitterAPI response of a stream request
+    def __init__(self, lines, status_code = 200, text = ''):
+        self.lines = lines
+        self.status_code = status_code
+        self.text = text
+        self.response = self # raw mode reads response.response
+
+    def iter_lines(self, chunk_size = None):
+        return(iter(self.lines))
+
+    def __iter__(self):
+        # TwitterAPI decodes every line
+        return(json.loads(x) for x in self.lines)
+
+
+class FakeTwitterAPI:
+    def __init__(self, lines, status_code = 200, text = ''):
+        self.lines = lines
+        self.status_code = status_code
+        self.text = text
+
+    def request(self, resource, params):
+        return(FakeResponse(self.lines, self.status_code, self.text))
+
+
+class FakePipe:
+    # keeps what is sent, pickled and unpickled as by a real pipe
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(pickle.loads(pickle.dumps(message)))
+
+
+## Define functions -----------------------------------------------------------
+def make_line(i):
+    tweet = {'created_at': 'Mon Feb 01 12:00:00 +0000 2021',
+             'id': 1356000000000000000 + i,
+             'id_str': str(1356000000000000000 + i),
+             'text': 'covid19 vaccine update number {} '.format(i) * 4,
+             'user': {'id': i, 'screen_name': 'user{}'.format(i),
+                      'description': 'x' * 160, 'followers_count': i},
+             'entities': {'hashtags': [{'text': 'covid19'}],
+                          'urls': [], 'user_mentions': []},
+             'lang': 'en'}
+    return(json.dumps(tweet).encode('utf-8'))
+
+
+def run(lines, raw, folder, batch_size = 500):
+    twitter_api = ConnectTwitterAPI('key', 'secret', 'token', 'secret')
+    twitter_api.input_dict = {'raw': raw,
+                              'transport': 'batch',
+                              'batch_size': batch_size,
+                              'batch_seconds': 3600,
+                              'keywords': ['covid19'],
+                              'file_prefix': 'benchmark',
+                              'download_path': folder}
+    twitter_api.api_type = 'stream_v1'
+    twitter_api.outlet_type = 'local'
+    twitter_api._get_ready()
+    twitter_api.twitter_api = FakeTwitterAPI(lines)
+    twitter_api.pipe_in = FakePipe()
+    twitter_api._start_sender()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w') # drop the progress messages
+    try:
+        start = time.process_time()
+        twitter_api._request_stream_v1()
+        twitter_api._send_finished()
+        tweets = []
+        for batch in twitter_api.pipe_in.messages[:-1]: # last is FINISHED
+            tweets += batch
+        twitter_api._save_file(tweets)
+        elapsed = time.process_time() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    assert len(tweets) == len(lines)
+    return(elapsed)
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_tweets = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = [make_line(i) for i in range(n_tweets)]
+    folder = tempfile.mkdtemp() + '/'
+    try:
+        decoded = run(lines, False, folder)
+        raw = run(lines, True, folder)
+    finally:
+        shutil.rmtree(folder)
+    scale = 100000 / n_tweets
+    print('decoded: {:.2f} CPU sec per 100k tweets'.format(decoded * scale))
+    print('raw:     {:.2f} CPU sec per 100k tweets'.format(raw * scale))
+    print('saved:   {:.2f} CPU sec per 100k tweets ({:.0%})'.format(
+          (decoded - raw) * scale, 1 - raw / decoded))
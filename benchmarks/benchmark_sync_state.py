@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the per-pass bookkeeping of SyncFolderToCloudStorage
+
+Old pass: list the folder (isfile per entry), strptime every name, build
+and sort a pandas DataFrame. New pass: scandir listing, then only the
+files missing from the SQLite sync state are parsed and indexed. Uploads
+are not included, only the work done before them.
+
+Usage:
+    python benchmarks/benchmark_sync_state.py [n_files] [n_new]
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import tempfile
+import importlib
+from datetime import datetime, timedelta
+from spike.DataTools import FileCMD
+from spike.TwitterMonitor.SyncState import SyncState
+sync = importlib.import_module('spike.TwitterMonitor.SyncFolderToCloudStorage')
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+TIME_POS = [7, 26]
+TIME_FORMAT = '%Y-%m-%d-%H-%M-%S'
+
+## Define functions -----------------------------------------------------------
+def make_files(folder, start, n_files):
+    first = datetime(2021, 1, 1)
+    for i in range(start, start + n_files):
+        file_time = (first + timedelta(seconds = i)).strftime(TIME_FORMAT)
+        file_name = 'tweets-' + file_time + '-0.zip'
+        open(os.path.join(folder, file_name), 'w').close()
+
+
+def old_pass(folder, marker):
+    folder = folder + '/'
+    file_list = [x for x in os.listdir(folder) if
+                 ('.zip' in x) and os.path.isfile(folder + x)]
+    file_list.sort()
+    file_time = [datetime.strptime(x[TIME_POS[0]:TIME_POS[1]], TIME_FORMAT)
+                 for x in file_list]
+    file_df = pd.DataFrame({'file_name': file_list, 'time': file_time})
+    file_df = file_df.sort_values(by = 'time',
+                                  ascending = True).reset_index()
+    upload_cutoff = datetime.strptime(marker[TIME_POS[0]:TIME_POS[1]],
+                                      TIME_FORMAT)
+    return(file_df[file_df['time'] > upload_cutoff]['file_name'].tolist())
+
+
+def new_pass(file_cmd, state, folder):
+    file_list = file_cmd.ListFiles(folder, '.zip')
+    sync._index_files(state, folder, file_list, TIME_POS, TIME_FORMAT)
+    upload_list = state.PendingFiles()
+    state.MarkUploaded({x: '' for x in upload_list})
+    return(upload_list)
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return(time.perf_counter() - start, len(result))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_new = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    folder = tempfile.mkdtemp()
+    file_cmd = FileCMD()
+    try:
+        make_files(folder, 0, n_files)
+        state = SyncState(os.path.join(folder, 'state.db'))
+        elapsed, count = measure(new_pass, file_cmd, state, folder)
+        print('new, first pass:   {:>8.3f} s {:>8} files'.format(elapsed,
+                                                                    count))
+        marker = max(file_cmd.ListFiles(folder, '.zip'))
+        make_files(folder, n_files, n_new)
+        if pd is not None:
+            elapsed, count = measure(old_pass, folder, marker)
+            print('old, steady pass:  {:>8.3f} s {:>8} files'.format(elapsed,
+                                                                       count))
+        elapsed, count = measure(new_pass, file_cmd, state, folder)
+        print('new, steady pass:  {:>8.3f} s {:>8} files'.format(elapsed,
+                                                                   count))
+        state.Close()
+        state = SyncState(os.path.join(folder, 'state.db'))
+        elapsed, count = measure(new_pass, file_cmd, state, folder)
+        print('new, after restart:{:>8.3f} s {:>8} files'.format(elapsed,
+                                                                   count))
+        state.Close()
+    finally:
+        shutil.rmtree(folder)
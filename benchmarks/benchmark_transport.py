@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the collector -> outlet transports of ConnectTwitterAPI
+
+Sends synthetic tweets from the current process to an outlet process
+and reports tweets/sec for each transport, with the default start
+method and with spawn (the default on macOS), which pickles the
+transport into the outlet process.
+
+Usage:
+    python benchmarks/benchmark_transport.py [n_tweets]
+"""
+
+## Set environment ------------------------------------------------------------
+import sys
+import time
+import multiprocessing
+from spike.TwitterMonitor import ConnectTwitterAPI
+
+## Define functions -----------------------------------------------------------
+def make_tweet(i):
+    return {'created_at': 'Mon Feb 01 12:00:00 +0000 2021',
+            'id': 1356000000000000000 + i,
+            'id_str': str(1356000000000000000 + i),
+            'text': 'covid19 vaccine update number {} '.format(i) * 4,
+            'user': {'id': i, 'screen_name': 'user{}'.format(i),
+                     'description': 'x' * 160, 'followers_count': i},
+            'entities': {'hashtags': [{'text': 'covid19'}],
+                         'urls': [], 'user_mentions': []},
+            'lang': 'en'}
+
+
+def drain(twitter_api, n_tweets):
+    received = 0
+    while True:
+        tweets = twitter_api._receive_tweets()
+        if tweets == "FINISHED":
+            break
+        received += len(tweets)
+    assert received == n_tweets
+
+
+def run(transport, n_tweets, tweets, start_method, **options):
+    multiprocessing.set_start_method(start_method, force = True)
+    twitter_api = ConnectTwitterAPI('key', 'secret', 'token', 'secret')
+    twitter_api.input_dict = dict(options,
+                                  transport = transport,
+                                  keywords = ['covid19'],
+                                  file_prefix = 'benchmark',
+                                  download_path = './')
+    twitter_api.api_type = 'stream_v1'
+    twitter_api.outlet_type = 'local'
+    twitter_api._get_ready()
+    outlet = multiprocessing.Process(target = drain,
+                                     args = (twitter_api, n_tweets))
+    outlet.start()
+    twitter_api._start_sender()
+    start = time.perf_counter()
+    for tweet in tweets:
+        twitter_api._send_tweet(tweet)
+    twitter_api._send_finished()
+    outlet.join()
+    elapsed = time.perf_counter() - start
+    if transport == 'ring':
+        twitter_api.ring.Close(unlink = True)
+    print('{:<24} {:>12,.0f} tweets/sec'.format(
+              '{} ({})'.format(transport, start_method), n_tweets / elapsed))
+
+
+## main -----------------------------------------------------------------------
+if __name__ == "__main__":
+    n_tweets = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tweets = [make_tweet(i) for i in range(n_tweets)]
+    for start_method in [multiprocessing.get_start_method(), 'spawn']:
+        run('pipe', n_tweets, tweets, start_method)
+        run('batch', n_tweets, tweets, start_method, batch_size = 500,
+            batch_seconds = 1)
+        run('ring', n_tweets, tweets, start_method, batch_size = 500,
+            batch_seconds = 1, ring_mb = 64)
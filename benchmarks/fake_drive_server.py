@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory fake of the Google Drive v3 API for the Drive benchmarks
+
+Serves files.list (paging, field projection), files.get (alt=media with
+Range too), files.create (multipart and resumable uploads),
+files.delete, files.update (addParents/removeParents) and batch requests
+over HTTP.
+Every HTTP request is delayed by rtt_ms to stand in for the network, and
+fail_rate of the calls (batched or not) fail with 503 to exercise
+retries. Point ConnectGoogleDrive at it with
+DRIVE_EMULATOR_HOST=http://127.0.0.1:port.
+
+Usage:
+    drive = FakeDrive(rtt_ms = 10)
+    folder_id = drive.AddItem('archive', None, folder = True)
+    drive.AddItem('tweets.zip', folder_id, data = b'...')
+    port = drive.Start()
+"""
+
+## Set environment ------------------------------------------------------------
+import re
+import json
+import hashlib
+import time
+import random
+import threading
+from email.parser import BytesParser
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FOLDER_TYPE = 'application/vnd.google-apps.folder'
+REASONS = {200: 'OK', 204: 'No Content', 206: 'Partial Content',
+           308: 'Resume Incomplete', 400: 'Bad Request', 404: 'Not Found',
+           416: 'Range Not Satisfiable', 503: 'Service Unavailable'}
+
+## Define class ---------------------------------------------------------------
+class FakeDrive:
+    def __init__(self, rtt_ms = 0, fail_rate = 0, seed = 0):
+        self.rtt_ms = rtt_ms
+        self.fail_rate = fail_rate
+        self.items = {}
+        self.children = {}
+        self.requests = 0
+        self.calls = 0
+        self.sessions = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+
+    def AddItem(self, name, parent, data = b'', folder = False):
+        item_id = 'id{:07d}'.format(len(self.items))
+        self.items[item_id] = {'id': item_id,
+                               'name': name,
+                               'parents': [parent] if parent else [],
+                               'mimeType': (FOLDER_TYPE if folder else
+                                            'application/octet-stream'),
+                               'data': data}
+        self.children.setdefault(parent, []).append(item_id)
+        return(item_id)
+
+
+    def _resource(self, item, fields):
+        resource = {x: item[x] for x in fields if x in item and x != 'data'}
+        if 'size' in fields and item['mimeType'] != FOLDER_TYPE:
+            resource['size'] = str(len(item['data']))
+        if 'md5Checksum' in fields and item['mimeType'] != FOLDER_TYPE:
+            resource['md5Checksum'] = hashlib.md5(item['data']).hexdigest()
+        return(resource)
+
+
+    def _fields(self, params, default):
+        fields = params.get('fields', [''])[0]
+        match = re.search(r'files\((.*)\)', fields)
+        if match:
+            fields = match.group(1)
+        fields = [x.strip() for x in fields.split(',') if x.strip()]
+        return(fields or default)
+
+
+    def _list(self, params):
+        query = params.get('q', [''])[0]
+        match = re.match(r"'(.+)' in parents", query)
+        if match:
+            ids = self.children.get(match.group(1), [])
+        else:
+            name = re.match(r"name='(.+)'", query).group(1)
+            ids = [x for x, y in self.items.items() if y['name'] == name]
+        start = int(params.get('pageToken', ['0'])[0])
+        end = start + int(params.get('pageSize', ['100'])[0])
+        fields = self._fields(params, ['id', 'name', 'mimeType'])
+        response = {'files': [self._resource(self.items[x], fields)
+                              for x in ids[start:end]]}
+        if end < len(ids):
+            response['nextPageToken'] = str(end)
+        return(response)
+
+
+    def _update(self, item, params):
+        for parent in params.get('removeParents', [''])[0].split(','):
+            if parent in item['parents']:
+                item['parents'].remove(parent)
+                self.children[parent].remove(item['id'])
+        for parent in params.get('addParents', [''])[0].split(','):
+            if parent and parent not in item['parents']:
+                item['parents'].append(parent)
+                self.children.setdefault(parent, []).append(item['id'])
+
+
+    def _call(self, method, path):
+        # one API call, (status, dict or None)
+        with self._lock:
+            self.calls += 1
+            if self._random.random() < self.fail_rate:
+                return(503, {'error': {'code': 503,
+                                       'message': 'Backend Error'}})
+            url = urlparse(path)
+            params = parse_qs(url.query)
+            parts = url.path.rstrip('/').split('/')
+            if url.path.rstrip('/') == '/drive/v3/files' and method == 'GET':
+                return(200, self._list(params))
+            item = self.items.get(parts[-1])
+            if parts[:-1] != ['', 'drive', 'v3', 'files'] or item is None:
+                return(404, {'error': {'code': 404,
+                                       'message': 'File not found'}})
+            if method == 'DELETE':
+                del self.items[item['id']]
+                for parent in item['parents']:
+                    self.children[parent].remove(item['id'])
+                return(204, None)
+            if method == 'PATCH':
+                self._update(item, params)
+            return(200, self._resource(item, self._fields(
+                                                params, ['id', 'name'])))
+
+
+    def _batch(self, content_type, body):
+        message = BytesParser().parsebytes(
+                      b'Content-Type: ' + content_type.encode() +
+                      b'\r\n\r\n' + body)
+        boundary = 'batch_fake_drive'
+        parts = []
+        for part in message.get_payload():
+            request = part.get_payload()
+            method, path = request.split('\n', 1)[0].split(' ')[:2]
+            status, response = self._call(method, path)
+            response = json.dumps(response) if response is not None else ''
+            parts.append('--{}\r\nContent-Type: application/http\r\n'
+                         'Content-ID: <response-{}>\r\n\r\n'
+                         'HTTP/1.1 {} {}\r\n'
+                         'Content-Type: application/json\r\n'
+                         'Content-Length: {}\r\n\r\n{}\r\n'.format(
+                             boundary, part['Content-ID'][1:-1], status,
+                             REASONS[status], len(response), response))
+        body = ''.join(parts) + '--{}--\r\n'.format(boundary)
+        return(200, 'multipart/mixed; boundary=' + boundary, body.encode())
+
+
+    def _media(self, item, byte_range):
+        data = item['data']
+        if not byte_range:
+            return(200, {}, data)
+        start, end = re.match(r'bytes=(\d+)-(\d*)', byte_range).groups()
+        start = int(start)
+        end = min(int(end) if end else len(data) - 1, len(data) - 1)
+        if start >= len(data):
+            return(416, {'Content-Range': 'bytes */{}'.format(len(data))},
+                   b'')
+        return(206, {'Content-Range': 'bytes {}-{}/{}'.format(
+                                          start, end, len(data))},
+               data[start:end + 1])
+
+
+    def _create(self, metadata, data, params):
+        parents = metadata.get('parents') or [None]
+        with self._lock:
+            item_id = self.AddItem(metadata['name'], parents[0], data = data)
+            return(self._resource(self.items[item_id], self._fields(
+                                      params, ['id', 'name'])))
+
+
+    def _upload(self, method, path, headers, body):
+        # (status, headers, dict) of an upload request
+        url = urlparse(path)
+        params = parse_qs(url.query)
+        if self._random.random() < self.fail_rate:
+            return(503, {}, {'error': {'code': 503,
+                                       'message': 'Backend Error'}})
+        upload_type = params.get('uploadType', [''])[0]
+        if method == 'POST' and upload_type == 'multipart':
+            # split by hand, the email parser is slow on large media
+            boundary = re.search(r'boundary="?([^";]+)',
+                                 headers['Content-Type']).group(1)
+            boundary = b'--' + boundary.encode()
+            newline = (b'\r\n' if body.startswith(boundary + b'\r\n') else
+                       b'\n')
+            metadata, media = [x.split(newline * 2, 1)[1][:-len(newline)]
+                               for x in body.split(boundary)[1:3]]
+            return(200, {}, self._create(json.loads(metadata), media,
+                                         params))
+        if method == 'POST' and upload_type == 'resumable':
+            with self._lock:
+                session = 'session{:05d}'.format(len(self.sessions))
+                self.sessions[session] = {'metadata': json.loads(body or
+                                                                 b'{}'),
+                                          'data': bytearray(),
+                                          'params': params}
+            host = headers['Host']
+            return(200, {'Location': 'http://{}{}&upload_id={}'.format(
+                                         host, path, session)}, None)
+        session = self.sessions.get(params.get('upload_id', [''])[0])
+        if method != 'PUT' or session is None:
+            return(404, {}, {'error': {'code': 404,
+                                       'message': 'Session not found'}})
+        match = re.match(r'bytes (\*|(\d+)-(\d+))/(\*|\d+)',
+                         headers.get('Content-Range', ''))
+        if match.group(2) is not None:
+            if int(match.group(2)) != len(session['data']):
+                return(400, {}, {'error': {'code': 400,
+                                           'message': 'Bad offset'}})
+            session['data'] += body
+        if (match.group(4) != '*' and
+            len(session['data']) == int(match.group(4))):
+            return(200, {}, self._create(session['metadata'],
+                                         bytes(session['data']),
+                                         session['params']))
+        if not session['data']:
+            return(308, {}, None)
+        return(308, {'Range': 'bytes=0-{}'.format(
+                                  len(session['data']) - 1)}, None)
+
+
+    def _handle(self, method, path, headers, body):
+        # (status, content type, body bytes) of an HTTP request, media
+        # responses add their headers as a 4th value
+        if method == 'POST' and path.startswith('/batch/'):
+            return(self._batch(headers['Content-Type'], body))
+        if path.startswith('/upload/'):
+            status, upload_headers, response = self._upload(
+                                                   method, path, headers,
+                                                   body)
+            body = json.dumps(response).encode() if response else b''
+            return(status, 'application/json', body, upload_headers)
+        if method == 'GET' and 'alt=media' in path:
+            item = self.items.get(urlparse(path).path.rstrip('/')
+                                  .split('/')[-1])
+            if item is None:
+                return(404, 'application/json', b'')
+            if self._random.random() < self.fail_rate:
+                return(503, 'application/json', b'')
+            status, media_headers, data = self._media(item,
+                                                      headers.get('Range'))
+            return(status, 'application/octet-stream', data, media_headers)
+        status, response = self._call(method, path)
+        if response is None:
+            return(status, 'application/json', b'')
+        return(status, 'application/json', json.dumps(response).encode())
+
+
+    def Start(self):
+        drive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self):
+                with drive._lock:
+                    drive.requests += 1
+                time.sleep(drive.rtt_ms / 1000)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                response = drive._handle(self.command, self.path,
+                                         self.headers, body)
+                status, content_type, body = response[:3]
+                self.send_response(status)
+                for key, value in (response[3:] or [{}])[0].items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target = self.server.serve_forever,
+                         daemon = True).start()
+        return(self.server.server_address[1])
+
+
+    def Stop(self):
+        self.server.shutdown()
@@ -11,43 +11,196 @@ Google Cloud Storage reference:
 """
 
 ## Set environment ------------------------------------------------------------
+import os
+import json
+import base64
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import storage
+from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
+from google.auth.credentials import AnonymousCredentials
 from google.auth.exceptions import DefaultCredentialsError
+from google.api_core.exceptions import NotFound
+from spike.DataTools.TransferSummary import TransferSummary
+try:
+    import google_crc32c
+except ImportError: # installed with google-cloud-storage, md5 otherwise
+    google_crc32c = None
 
 ## Define class ---------------------------------------------------------------
 class ConnectGoogleCloudStorage:
     """Object that connects Google Cloud Storage
+    Keep one object for the life of the program, its HTTP connections
+    are reused by every call and every thread.
     Functions:
         .ListFiles(bucket_name, bucket_folder = None)
+        .IterFiles(bucket_name, bucket_folder = None,
+                  delimiter = None, start_offset = None,
+                  end_offset = None, fields = ['name', 'size', 'updated'],
+                  page_size = 1000)
         .DownloadFile(bucket_name, download_path,
                      file_name, bucket_folder = None)
+        .DownloadFolder(bucket_name, download_path,
+                       bucket_folder = None, workers = 8,
+                       range_mb = 64)
         .UploadFile(bucket_name, source_path,
-                   file_name, bucket_folder = None)
+                   file_name, bucket_folder = None,
+                   chunk_mb = None, composite_mb = None,
+                   composite_parts = 8)
         .DeleteFile(bucket_name, file_name, bucket_folder = None)
         .MoveFile(from_bucket_name, from_bucket_folder,
                  to_bucket_name, to_bucket_folder, file_name)
+        .DeleteFiles(bucket_name, file_list, bucket_folder = None,
+                    workers = 4)
+        .MoveFiles(from_bucket_name, from_bucket_folder,
+                  to_bucket_name, to_bucket_folder, file_list,
+                  workers = 4)
+        .ConnectionStats()
     """
     
-    def __init__(self, token_path):
+    CHUNK_UNIT = 262144 # resumable chunks are multiples of 256 KiB
+    PART_CHUNK_MB = 8 # chunk size of composite parts by default
+    COMPOSE_LIMIT = 32 # max number of sources per compose request
+    BATCH_LIMIT = 100 # max number of calls per batch request
+    TIMEOUT = (10, 300)
+    POOL_SIZE = 10 # default max connections kept open per host
+    
+    def __init__(self, token_path, pool_size = None):
+        """
+        Parameters: 
+            token_path (str): path of the service account json file.
+            pool_size (int): max number of connections kept open, set it
+                             to the number of concurrent transfers.
+                             Default None, POOL_SIZE.
+        """
+        self._local = threading.local()
+        if os.environ.get('STORAGE_EMULATOR_HOST'):
+            # local emulator (e.g. fake-gcs-server), no credentials needed
+            credentials = AnonymousCredentials()
+            self.client = storage.Client(
+                project = os.environ.get('GOOGLE_CLOUD_PROJECT', 'test'),
+                credentials = credentials,
+                _http = self._session(credentials, pool_size))
+            print('Connected to Cloud Storage emulator ' +
+                  os.environ['STORAGE_EMULATOR_HOST'] + '.')
+            return(None)
         if not token_path:
             print('TOKEN_PATH is needed.')
             return(None)
         try:
-            # windows might get error:
-            # 'ClientOptions' object has no attribute 'credentials_file'
-            self.client = storage.Client.from_service_account_json(token_path)
+            credentials = service_account.Credentials.from_service_account_file(
+                              token_path, scopes = storage.Client.SCOPE)
+            self.client = storage.Client(
+                project = credentials.project_id,
+                credentials = credentials,
+                _http = self._session(credentials, pool_size))
             print('Connected to Google Cloud Storage.')
-        except DefaultCredentialsError as dce:
+        except (DefaultCredentialsError, ValueError) as dce:
             print(dce)
             return(None)
 
 
+    def _session(self, credentials, pool_size):
+        # one pooled HTTP session shared by all clients and threads, the
+        # token is refreshed by the session only when it expires
+        pool_size = pool_size or self.POOL_SIZE
+        self._adapter = requests.adapters.HTTPAdapter(
+                            pool_connections = 4,
+                            pool_maxsize = pool_size)
+        session = AuthorizedSession(credentials)
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        return(session)
+
+
+    def ConnectionStats(self):
+        """Connection reuse of the HTTP pool
+        Returns:     
+            dict: {requests, connections (opened), reuse (share of
+                   requests sent on an open connection)}.
+        """ 
+        pools = self._adapter.poolmanager.pools
+        pools = [pools[x] for x in pools.keys()]
+        n_requests = sum([x.num_requests for x in pools])
+        n_connections = sum([x.num_connections for x in pools])
+        return({'requests': n_requests,
+                'connections': n_connections,
+                'reuse': (1 - n_connections / n_requests
+                          if n_requests else 0)})
+
+
     def _check_path(self, path):
         if path[-1] != '/':
             path = path + '/'
         return(path)
 
 
+    def _split_name(self, name):
+        # 'a/b/c.txt' -> ('a/b/', 'c.txt'), 'c.txt' -> ('', 'c.txt'),
+        # folder placeholder objects 'a/b/' -> ('a/b/', '') as ListFiles
+        # has always returned them
+        if '/' not in name:
+            return('', name)
+        folder, name = name.rsplit('/', 1)
+        return(folder + '/', name)
+
+
+    def IterFiles(self, bucket_name, bucket_folder = None,
+                  delimiter = None, start_offset = None,
+                  end_offset = None, fields = ['name', 'size', 'updated'],
+                  page_size = 1000):
+        """Iterate over the files page by page, pages are fetched lazily
+        Parameters:     
+           bucket_name (str): name of the storage bucket.
+           bucket_folder (str): path of the bucket folder. Can be None.
+           delimiter (str): '/' lists one level only, the sub-folders
+                            are yielded with size None and a name
+                            ending in '/'. Can be None.
+           start_offset (str): only names >= start_offset. Can be None.
+           end_offset (str): only names < end_offset. Can be None.
+           fields (list(str)): object fields to fetch (JSON API names),
+                               name is always fetched.
+           page_size (int): max number of files per page. Default 1000.
+        Returns:     
+           generator(list(dict)): pages of {bucket_folder, name, ...},
+                                  size is int, others as in the API.
+        """ 
+        if not bucket_name:
+            print('BUCKET_NAME is needed.')
+            return
+        fields = ['name'] + [x for x in (fields or []) if x != 'name']
+        blobs = self.client.list_blobs(bucket_name,
+                                       prefix = bucket_folder,
+                                       delimiter = delimiter,
+                                       start_offset = start_offset,
+                                       end_offset = end_offset,
+                                       page_size = page_size,
+                                       fields = 'items({}),prefixes,'
+                                                'nextPageToken'.format(
+                                                ','.join(fields)))
+        for page in blobs.pages:
+            item_list = []
+            for blob in page:
+                folder, name = self._split_name(blob.name)
+                item = {'bucket_folder': folder, 'name': name}
+                for field in fields[1:]:
+                    item[field] = blob._properties.get(field)
+                if item.get('size') is not None:
+                    item['size'] = int(item['size'])
+                item_list.append(item)
+            for prefix in page.prefixes:
+                # a sub-folder is named in its parent: 'a/b/' -> ('a/', 'b/')
+                folder, name = self._split_name(prefix.rstrip('/'))
+                name = name + '/'
+                item = {'bucket_folder': folder, 'name': name}
+                item.update({x: None for x in fields[1:]})
+                item_list.append(item)
+            yield(item_list)
+
+
     def ListFiles(self, bucket_name, bucket_folder = None):
         """List files
         Parameters:     
@@ -59,11 +212,11 @@ class ConnectGoogleCloudStorage:
         if not bucket_name:
             print('BUCKET_NAME is needed.')
             return(None)
-        blobs = self.client.list_blobs(bucket_name, prefix = bucket_folder)
-        blob_list = [blob.name for blob in blobs]
-        blob_list.sort()
-        item_list = [{'bucket_folder': x.rsplit('/', 1)[0] + '/',
-                      'name': x.rsplit('/', 1)[1]} for x in blob_list]
+        # names come sorted from the API
+        item_list = []
+        for page in self.IterFiles(bucket_name, bucket_folder,
+                                   fields = ['name']):
+            item_list += page
         return(item_list)
 
 
@@ -93,16 +246,322 @@ class ConnectGoogleCloudStorage:
         print(download_path + file_name + ' is downloaded.')
 
 
+    def _download_range(self, bucket, name, generation, file_path,
+                        start, end):
+        # write bytes [start, end] of the object into its place in the
+        # pre-allocated file
+        blob = bucket.blob(name, generation = generation)
+        with open(file_path, 'r+b') as file:
+            file.seek(start)
+            blob.download_to_file(file, start = start, end = end,
+                                  checksum = None)
+
+
+    def DownloadFolder(self, bucket_name, download_path,
+                       bucket_folder = None, workers = 8,
+                       range_mb = 64):
+        """Download the files under a bucket folder concurrently
+        Parameters:  
+            bucket_name (str): name of the storage bucket.
+            download_path (str): path of the download folder.
+            bucket_folder (str): path of the bucket folder. Can be None.
+            workers (int): number of concurrent requests. Default 8.
+            range_mb (int): files larger than this are fetched as
+                            concurrent byte ranges of this size.
+                            Default 64.
+        Returns:     
+           dict: {files, skipped, failed, bytes, seconds, mb_per_sec},
+                 failed is the list of files that are not downloaded.
+        """ 
+        if not bucket_name or not download_path:
+            print('BUCKET_NAME, DOWNLOAD_PATH are needed.')
+            return(None)
+        download_path = self._check_path(download_path)
+        if bucket_folder:
+            bucket_folder = self._check_path(bucket_folder)
+        else:
+            bucket_folder = ''
+        summary = TransferSummary('download')
+        bucket = self.client.bucket(bucket_name)
+        range_size = max(1, int(range_mb * 1048576))
+        lock = threading.Lock()
+        remaining = {}
+
+        def fail(blob, error):
+            # a file is reported once, whatever number of its ranges fail
+            with lock:
+                if remaining[blob.name] < 0:
+                    return
+                remaining[blob.name] = -1
+            summary.Fail(blob.name, error)
+
+        def finish(blob, file_path, error = None):
+            # runs after each range, the file is completed after its last
+            if error is not None:
+                fail(blob, error)
+                return
+            with lock:
+                if remaining[blob.name] < 0:
+                    return # another range failed
+                remaining[blob.name] -= 1
+                if remaining[blob.name] != 0:
+                    return
+            try:
+                if blob.size > range_size:
+                    matched = self._match_checksums(file_path + '.partial',
+                                                    blob._properties)
+                    if matched is None:
+                        print('No checksum to compare for ' + blob.name +
+                              ', it is not verified.')
+                    elif not matched:
+                        raise ValueError('checksum mismatch')
+                os.replace(file_path + '.partial', file_path)
+            except Exception as e:
+                fail(blob, e)
+                return
+            summary.Done(blob.size)
+
+        def fetch(blob, file_path, start = None, end = None):
+            try:
+                if start is None:
+                    # one request, the library verifies the md5
+                    blob.download_to_filename(file_path + '.partial')
+                else:
+                    self._download_range(bucket, blob.name, blob.generation,
+                                         file_path + '.partial', start, end)
+            except Exception as e:
+                finish(blob, file_path, e)
+                return
+            finish(blob, file_path)
+
+        futures = []
+        with ThreadPoolExecutor(max_workers = workers) as executor:
+            for blob in self.client.list_blobs(bucket_name,
+                                               prefix = bucket_folder):
+                if blob.name.endswith('/'):
+                    continue # folder placeholder
+                file_path = download_path + blob.name[len(bucket_folder):]
+                # skip files that are already downloaded
+                if (os.path.isfile(file_path) and
+                    os.path.getsize(file_path) == blob.size and
+                    self._match_checksums(file_path, blob._properties)):
+                    summary.Skip()
+                    continue
+                os.makedirs(os.path.dirname(file_path), exist_ok = True)
+                if blob.size <= range_size:
+                    remaining[blob.name] = 1
+                    futures.append((blob, executor.submit(fetch, blob,
+                                                          file_path)))
+                    continue
+                # pre-allocate the file, the ranges fill it in place
+                with open(file_path + '.partial', 'wb') as file:
+                    file.truncate(blob.size)
+                ranges = range(0, blob.size, range_size)
+                remaining[blob.name] = len(ranges)
+                for start in ranges:
+                    futures.append((blob, executor.submit(
+                        fetch, blob, file_path, start,
+                        min(start + range_size, blob.size) - 1)))
+        # errors that escaped fetch still count the file as failed
+        for blob, future in futures:
+            if future.exception() is not None:
+                fail(blob, future.exception())
+        # drop the partial files of failed downloads
+        for name in summary.result['failed']:
+            partial = download_path + name[len(bucket_folder):] + '.partial'
+            if os.path.isfile(partial):
+                os.remove(partial)
+        return(summary.Finish())
+
+
+    def _file_checksums(self, file_path, start = 0, size = None):
+        # base64 digests named as in the object metadata, of the bytes
+        # [start, start + size) when size is given
+        md5 = hashlib.md5()
+        crc = google_crc32c.Checksum() if google_crc32c else None
+        with open(file_path, 'rb') as file:
+            file.seek(start)
+            left = size
+            while left is None or left > 0:
+                chunk = file.read(1048576 if left is None else
+                                  min(1048576, left))
+                if not chunk:
+                    break
+                if left is not None:
+                    left -= len(chunk)
+                md5.update(chunk)
+                if crc is not None:
+                    crc.update(chunk)
+        checksums = {'md5Hash': base64.b64encode(md5.digest()).decode()}
+        if crc is not None:
+            checksums['crc32c'] = base64.b64encode(crc.digest()).decode()
+        return(checksums)
+
+
+    def _match_checksums(self, file_path, resource, start = 0, size = None):
+        # compare a local file (or its bytes [start, start + size)) with
+        # object metadata, None if the metadata has no checksum that can
+        # be compared
+        checksums = self._file_checksums(file_path, start, size)
+        keys = [x for x in checksums if resource.get(x)]
+        if len(keys) == 0:
+            return(None)
+        return(all([checksums[x] == resource[x] for x in keys]))
+
+
+    def _next_offset(self, response):
+        # the Range header holds the bytes persisted by the server
+        persisted = response.headers.get('Range')
+        if not persisted:
+            return(0)
+        return(int(persisted.rsplit('-', 1)[1]) + 1)
+
+
+    def _open_session(self, blob, session_file, source):
+        # source is {blob, start, size, mtime_ns} of the uploaded bytes,
+        # returns (session url, offset), offset is None if the upload
+        # is already complete
+        http = self.client._http
+        size = source['size']
+        if os.path.isfile(session_file):
+            with open(session_file) as file:
+                session = json.load(file)
+            if session.get('source') == source:
+                response = http.put(session['url'],
+                                    headers = {'Content-Range':
+                                               'bytes */' + str(size)},
+                                    timeout = self.TIMEOUT)
+                if response.status_code == 308:
+                    offset = self._next_offset(response)
+                    print('Resuming ' + blob.name + ' from byte ' +
+                          str(offset) + '.')
+                    return(session['url'], offset)
+                if response.status_code in (200, 201):
+                    return(session['url'], None)
+                # session expired, start a new one
+        url = blob.create_resumable_upload_session(size = size)
+        with open(session_file, 'w') as file:
+            json.dump({'url': url, 'source': source}, file)
+        return(url, 0)
+
+
+    def _upload_resumable(self, blob, file_path, session_file, chunk_size,
+                          start = 0, size = None):
+        # upload bytes [start, start + size) chunk by chunk, returns the
+        # object metadata
+        if size is None:
+            size = os.path.getsize(file_path) - start
+        source = {'blob': blob.name, 'start': start, 'size': size,
+                  'mtime_ns': os.stat(file_path).st_mtime_ns}
+        url, offset = self._open_session(blob, session_file, source)
+        http = self.client._http
+        resource = None
+        if offset is None:
+            blob.reload()
+            resource = blob._properties
+        with open(file_path, 'rb') as file:
+            while resource is None:
+                file.seek(start + offset)
+                chunk = file.read(min(chunk_size, size - offset))
+                if chunk:
+                    content_range = 'bytes {}-{}/{}'.format(
+                                        offset, offset + len(chunk) - 1, size)
+                else: # empty file, or every byte is persisted
+                    content_range = 'bytes */' + str(size)
+                response = http.put(url,
+                                    data = chunk,
+                                    headers = {'Content-Range': content_range},
+                                    timeout = self.TIMEOUT)
+                if response.status_code == 308:
+                    offset = self._next_offset(response)
+                elif response.status_code in (200, 201):
+                    resource = response.json()
+                else:
+                    # the session file stays, a retry resumes the upload
+                    response.raise_for_status()
+                    raise IOError('Unexpected upload response {}.'.format(
+                                  response.status_code))
+        os.remove(session_file)
+        return(resource)
+
+
+    def _upload_composite(self, bucket, blob, file_path, session_path,
+                          chunk_size, parts):
+        # upload the parts concurrently as temporary objects, compose
+        # them into blob and delete them, returns the object metadata.
+        # The parts are kept until the compose succeeds, a retry skips
+        # the parts that are uploaded already.
+        size = os.path.getsize(file_path)
+        part_size = -(-size // parts)
+        ranges = [(x, min(part_size, size - x))
+                  for x in range(0, size, part_size)]
+        part_blobs = [bucket.blob('{}.part-{:03d}-of-{:03d}'.format(
+                                  blob.name, i + 1, len(ranges)))
+                      for i in range(len(ranges))]
+
+        def upload_part(i):
+            session_file = (session_path +
+                            part_blobs[i].name.rsplit('/', 1)[-1] + '.json')
+            if not os.path.isfile(session_file):
+                # left by an earlier attempt whose compose failed
+                try:
+                    part_blobs[i].reload()
+                except NotFound:
+                    pass
+                else:
+                    if (part_blobs[i].size == ranges[i][1] and
+                        self._match_checksums(file_path,
+                                              part_blobs[i]._properties,
+                                              ranges[i][0], ranges[i][1])):
+                        return(part_blobs[i]._properties)
+            return(self._upload_resumable(part_blobs[i], file_path,
+                                          session_file, chunk_size,
+                                          ranges[i][0], ranges[i][1]))
+
+        with ThreadPoolExecutor(max_workers = len(ranges)) as executor:
+            list(executor.map(upload_part, range(len(ranges))))
+        blob.compose(part_blobs[:self.COMPOSE_LIMIT])
+        for i in range(self.COMPOSE_LIMIT, len(part_blobs),
+                       self.COMPOSE_LIMIT - 1):
+            # a new destination, the old one carries a stale crc32c
+            composed = bucket.blob(blob.name)
+            composed.compose([blob] +
+                             part_blobs[i:i + self.COMPOSE_LIMIT - 1])
+            blob = composed
+        for part_blob in part_blobs:
+            try:
+                part_blob.delete()
+            except NotFound:
+                pass
+        return(blob._properties)
+
+
     def UploadFile(self, bucket_name, source_path,
-                   file_name, bucket_folder = None):
+                   file_name, bucket_folder = None,
+                   chunk_mb = None, composite_mb = None,
+                   composite_parts = 8):
         """Upload a file from local disk to Cloud Storage
         Parameters:  
             bucket_name (str): name of the storage bucket.
             source_path (str): path of the source folder.
             file_name (str): name of the target file.
             bucket_folder (str): path of the bucket folder. Can be None.
+            chunk_mb (int): upload in resumable chunks of this size and
+                            verify the object checksum. The session is
+                            saved in source_path/.upload_sessions/, so an
+                            interrupted upload continues on the next call.
+                            Default None, upload in one request.
+            composite_mb (int): files of at least this size are split
+                                into composite_parts parts that are
+                                uploaded concurrently and composed into
+                                one object. The parts are kept until the
+                                compose succeeds, a retry uploads only
+                                the missing ones. Default None, never
+                                split.
+            composite_parts (int): number of parts (max 1024). Default 8.
         Returns:     
-           None
+           str: base64 md5 of the uploaded object (crc32c if the
+                object has no md5).
         """ 
         if not bucket_name or not source_path or not file_name:
             print('BUCKET_NAME, SOURCE_PATH, FILE_NAME are needed.')
@@ -115,8 +574,40 @@ class ConnectGoogleCloudStorage:
         # upload file
         bucket = self.client.bucket(bucket_name)
         blob = bucket.blob(bucket_folder + file_name)
-        blob.upload_from_filename(source_path + file_name)
-        print(bucket_folder + file_name + ' is uploaded.')
+        composite = (composite_mb and composite_parts > 1 and
+                     os.path.getsize(source_path + file_name) >=
+                     composite_mb * 1048576)
+        if not chunk_mb and not composite:
+            blob.upload_from_filename(source_path + file_name)
+            print(bucket_folder + file_name + ' is uploaded.')
+            return(blob.md5_hash or blob.crc32c)
+        chunk_size = int((chunk_mb or self.PART_CHUNK_MB) * 1048576)
+        chunk_size = max(1, chunk_size // self.CHUNK_UNIT) * self.CHUNK_UNIT
+        session_path = source_path + '.upload_sessions/'
+        os.makedirs(session_path, exist_ok = True)
+        if composite:
+            resource = self._upload_composite(bucket,
+                                              blob,
+                                              source_path + file_name,
+                                              session_path,
+                                              chunk_size,
+                                              min(composite_parts, 1024))
+        else:
+            resource = self._upload_resumable(blob,
+                                              source_path + file_name,
+                                              session_path + file_name +
+                                              '.json',
+                                              chunk_size)
+        # compare the local checksums with the object metadata
+        matched = self._match_checksums(source_path + file_name, resource)
+        if matched is None:
+            print('No checksum in the metadata of ' + blob.name + '.')
+        elif not matched:
+            blob.delete()
+            raise ValueError('Checksum mismatch for ' + blob.name +
+                             ', the object is deleted.')
+        print(bucket_folder + file_name + ' is uploaded and verified.')
+        return(resource.get('md5Hash') or resource.get('crc32c'))
 
 
     def DeleteFile(self, bucket_name, file_name, bucket_folder = None):
@@ -142,6 +633,13 @@ class ConnectGoogleCloudStorage:
         print(bucket_folder + file_name + ' is deleted.')
 
 
+    def _rewrite(self, origin_blob, dest_blob):
+        # large objects take more than one rewrite call
+        (token, _, __) = dest_blob.rewrite(origin_blob)
+        while token is not None:
+            (token, _, __) = dest_blob.rewrite(origin_blob, token = token)
+
+
     def MoveFile(self, from_bucket_name, from_bucket_folder,
                  to_bucket_name, to_bucket_folder, file_name):
         """Move a file from one Storage bucket/folder to another
@@ -172,13 +670,150 @@ class ConnectGoogleCloudStorage:
         origin_blob = origin_bucket.blob(from_bucket_folder + file_name)
         dest_bucket = self.client.bucket(to_bucket_name)
         dest_blob = dest_bucket.blob(to_bucket_folder + file_name)
-        (token, _, __) = dest_blob.rewrite(origin_blob)
-        while token is not None:
-            (token, _, __) = dest_blob.rewrite(origin_blob, token = token)
-        if token is not None:
-            print("Moving didn't finish.")
-            return(None)
+        self._rewrite(origin_blob, dest_blob)
         origin_blob.delete()
         print(file_name + ' is moved to ' +
               to_bucket_name + '/' + to_bucket_folder)
     
+
+
+    def _worker_client(self):
+        # one client per thread, a batch belongs to the client it runs on
+        if not hasattr(self._local, 'client'):
+            self._local.client = storage.Client(
+                                    project = self.client.project,
+                                    credentials = self.client._credentials,
+                                    _http = self.client._http)
+        return(self._local.client)
+
+
+    def _run_batch(self, calls, missing_ok = False):
+        # calls are [(file_name, function(client, file_name))], returns
+        # {file_name: success}
+        client = self._worker_client()
+        try:
+            with client.batch(raise_exception = False) as batch:
+                for file_name, call in calls:
+                    call(client, file_name)
+            return({x[0]: (200 <= y.status_code < 300 or
+                           (missing_ok and y.status_code == 404))
+                    for x, y in zip(calls, batch._responses)})
+        except Exception as e:
+            # the batch request failed as a whole, one request per object
+            print('Batch request failed ({}), retrying one by one.'.format(e))
+        results = {}
+        for file_name, call in calls:
+            try:
+                call(client, file_name)
+                results[file_name] = True
+            except NotFound:
+                results[file_name] = missing_ok
+            except Exception as e:
+                print('Failed {}: {}'.format(file_name, e))
+                results[file_name] = False
+        return(results)
+
+
+    def _run_batches(self, calls, workers = 4, missing_ok = False):
+        # BATCH_LIMIT calls per batch, batches run concurrently
+        batches = [calls[i:i + self.BATCH_LIMIT]
+                   for i in range(0, len(calls), self.BATCH_LIMIT)]
+        results = {}
+        with ThreadPoolExecutor(max_workers = max(1, workers)) as executor:
+            for result in executor.map(lambda x: self._run_batch(x,
+                                       missing_ok), batches):
+                results.update(result)
+        return(results)
+
+
+    def DeleteFiles(self, bucket_name, file_list, bucket_folder = None,
+                    workers = 4):
+        """Delete files from Cloud Storage in batch requests
+        Parameters:  
+            bucket_name (str): name of the storage bucket.
+            file_list (list(str)): names of the target files.
+            bucket_folder (str): path of the bucket folder. Can be None.
+            workers (int): number of concurrent batch requests.
+                           Default 4.
+        Returns:     
+           dict: {file_name: True if deleted or not found, else False}
+        """ 
+        if not bucket_name or file_list is None:
+            print('BUCKET_NAME, FILE_LIST are needed.')
+            return(None)
+        if bucket_folder:
+            bucket_folder = self._check_path(bucket_folder)
+        else:
+            bucket_folder = ''
+
+        def delete(client, file_name):
+            client.bucket(bucket_name).blob(bucket_folder + file_name).delete()
+
+        results = self._run_batches([(x, delete) for x in file_list],
+                                    workers, missing_ok = True)
+        print('{} of {} files are deleted from {}.'.format(
+              list(results.values()).count(True), len(file_list),
+              bucket_name + '/' + bucket_folder))
+        return(results)
+
+
+    def MoveFiles(self, from_bucket_name, from_bucket_folder,
+                  to_bucket_name, to_bucket_folder, file_list,
+                  workers = 4):
+        """Move files from one Storage bucket/folder to another in batch
+        requests (copy, then delete the copied origins)
+        Parameters:  
+            from_bucket_name (str): name of the origin bucket.
+            from_bucket_folder (str): path of the origin bucket folder.
+                                        Can be None.
+            to_bucket_name (str): name of the dest bucket.
+            to_bucket_folder (str): path of the dest bucket folder.
+                                        Can be None.
+            file_list (list(str)): names of the target files.
+            workers (int): number of concurrent batch requests.
+                           Default 4.
+        Returns:     
+           dict: {file_name: True if moved, else False}
+        """
+        if not from_bucket_name or not to_bucket_name or file_list is None:
+            print('ORIGIN/DEST_BUCKET_NAME, FILE_LIST are needed.')
+            return(None)
+        if from_bucket_folder:
+            from_bucket_folder = self._check_path(from_bucket_folder)
+        else:
+            from_bucket_folder = ''
+        if to_bucket_folder:
+            to_bucket_folder = self._check_path(to_bucket_folder)
+        else:
+            to_bucket_folder = ''
+
+        def copy(client, file_name):
+            origin_bucket = client.bucket(from_bucket_name)
+            origin_bucket.copy_blob(origin_bucket.blob(from_bucket_folder +
+                                                       file_name),
+                                    client.bucket(to_bucket_name),
+                                    to_bucket_folder + file_name)
+
+        def delete(client, file_name):
+            client.bucket(from_bucket_name).blob(from_bucket_folder +
+                                                 file_name).delete()
+
+        results = self._run_batches([(x, copy) for x in file_list], workers)
+        # copies that failed in the batch, e.g. large objects that
+        # need more than one rewrite call
+        for file_name in [x for x in file_list if not results[x]]:
+            try:
+                self._rewrite(self.client.bucket(from_bucket_name)
+                              .blob(from_bucket_folder + file_name),
+                              self.client.bucket(to_bucket_name)
+                              .blob(to_bucket_folder + file_name))
+                results[file_name] = True
+            except Exception as e:
+                print('Failed copying {}: {}'.format(file_name, e))
+        copied = [x for x in file_list if results[x]]
+        results.update(self._run_batches([(x, delete) for x in copied],
+                                         workers))
+        print('{} of {} files are moved to {}.'.format(
+              list(results.values()).count(True), len(file_list),
+              to_bucket_name + '/' + to_bucket_folder))
+        return(results)
@@ -11,30 +11,74 @@ Google Drive API v3 reference:
 """
 
 ## Set environment ------------------------------------------------------------
-import io
 import os
+import json
+import time
 import pickle
+import hashlib
 import os.path
-from googleapiclient.http import MediaIoBaseDownload
-from googleapiclient.discovery import build, MediaFileUpload
+import threading
+import httplib2
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import BatchHttpRequest, build_http
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery import MediaFileUpload
+from googleapiclient.discovery_cache import get_static_doc
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-# from googleapiclient.errors import HttpError
-import shutil
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.errors import HttpError
 
 ## Define class ---------------------------------------------------------------
 class ConnectGoogleDrive:
     """Object that connects Google Drive
     Functions:
         .CreateFolder(parents, folder_name)
-        .ListItems(item_name, parents)
-        .DownloadFile(download_path, file_name, file_id)
-        .UploadFile(source_path, parents, file_name)
+        .ListItems(item_name, parents, fields = ['id', 'name',
+                  'parents', 'size'], page_size = 1000,
+                  recursive = False, workers = 4)
+        .IterItems(item_name, parents, fields = ['id', 'name',
+                  'parents', 'size'], page_size = 1000,
+                  recursive = False, workers = 4)
+        .DownloadFile(download_path, file_name, file_id, chunk_mb = 32)
+        .UploadFile(source_path, parents, file_name, chunk_mb = None,
+                    multipart_mb = 5)
         .DeleteFile(file_id)
         .MoveFile(file_id, new_parents)
+        .GetItems(file_ids, fields = ['id', 'name', 'parents'])
+        .DeleteFiles(file_ids)
+        .MoveFiles(file_ids, new_parents, old_parents = None)
     """
 
+    FOLDER_TYPE = 'application/vnd.google-apps.folder'
+    PAGE_LIMIT = 1000 # max pageSize of files.list
+    BATCH_LIMIT = 100 # max calls per batch request
+    BACKOFF_MAX = 32 # max seconds between retries of failed calls
+    RETRY_STATUS = [429, 500, 502, 503, 504] # transient errors
+    # Drive returns 403 for rate limits too, other 403s are final
+    RATE_LIMIT_REASONS = ['rateLimitExceeded', 'userRateLimitExceeded']
+    UPLOAD_UNIT = 262144 # resumable chunks are multiples of 256 KB
+    CHUNK_START = 8388608 # first chunk of an adaptive upload
+    CHUNK_MAX = 134217728 # largest adaptive chunk, the memory used
+    CHUNK_SECONDS = 4 # adaptive chunks aim at this upload time
+    
     def __init__(self, token_path):
+        self._local = threading.local()
+        self._batch_uri = None
+        if os.environ.get('DRIVE_EMULATOR_HOST'):
+            # local fake Drive server, no credentials needed
+            host = os.environ['DRIVE_EMULATOR_HOST'].rstrip('/')
+            self.creds = AnonymousCredentials()
+            # a new rootUrl moves the upload and batch URLs too, the
+            # api_endpoint option keeps https for uploads
+            document = json.loads(get_static_doc('drive', 'v3'))
+            document['rootUrl'] = host + '/'
+            self.service = build_from_document(document,
+                                               credentials = self.creds)
+            self._batch_uri = host + '/batch/drive/v3'
+            print('Connected to Google Drive emulator ' + host + '.')
+            return(None)
         # Define the scopes 
         SCOPES = ['https://www.googleapis.com/auth/drive']
         # read token
@@ -53,16 +97,35 @@ class ConnectGoogleDrive:
             # Save the credentials for the next run
             with open(token_path, 'wb') as token:
                 pickle.dump(creds, token)
+        self.creds = creds
         self.service = build('drive', 'v3', credentials = creds)
         print("Connected to Google Drive")
 
 
+    def _http(self):
+        # httplib2 is not thread-safe, one authorized Http per thread,
+        # pass it to execute(http = ...)
+        if not hasattr(self._local, 'http'):
+            self._local.http = AuthorizedHttp(self.creds,
+                                              http = build_http())
+        return(self._local.http)
+
+
     def _check_path(self, path):
         if path[-1] != '/':
             path = path + '/'
         return(path)
 
 
+    def _file_md5(self, file_path):
+        # hex digest, as md5Checksum of the Drive metadata
+        md5 = hashlib.md5()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1048576), b''):
+                md5.update(chunk)
+        return(md5.hexdigest())
+
+
     def CreateFolder(self, parents, folder_name):
         """Create a folder
         Parameters:     
@@ -79,59 +142,171 @@ class ConnectGoogleDrive:
         }
         # create folder
         response = self.service.files().create(body = file_metadata,
-                            fields = 'id, name, parents').execute()
+                            fields = 'id, name, parents').execute(
+                                http = self._http())
         print(folder_name + ' is created.')
         return(response)
 
 
-    def ListItems(self, item_name, parents):
-        """List items (file/folder) by name or parents 
+    def _iter_pages(self, query, fields, page_size):
+        page_token = None
+        while True:
+            response = self.service.files().list(
+                        q = query,
+                        spaces = 'drive',
+                        pageSize = min(page_size, self.PAGE_LIMIT),
+                        fields = 'nextPageToken, files({})'.format(
+                                    ', '.join(fields)),
+                        pageToken = page_token
+                        ).execute(http = self._http())
+            yield(response.get('files', []))
+            page_token = response.get('nextPageToken', None)
+            if page_token is None:
+                break
+
+
+    def _list_folder(self, folder_id, fields, page_size):
+        return(list(self._iter_pages("'{}' in parents".format(folder_id),
+                                     fields, page_size)))
+
+
+    def IterItems(self, item_name, parents,
+                  fields = ['id', 'name', 'parents', 'size'],
+                  page_size = 1000, recursive = False, workers = 4):
+        """Iterate over items (file/folder) by name or parents page by
+        page, pages are fetched lazily
         Parameters:     
            item_name (str): name of file/folder. Can be None.
            parents (str): target folder ID. Can be None.
+           fields (list(str)): file fields to fetch (API names).
+           page_size (int): max number of items per page, up to 1000.
+                            Default 1000.
+           recursive (bool): list the sub-folders of parents too,
+                             mimeType is fetched then. Default False.
+           workers (int): number of folders listed concurrently when
+                          recursive. Default 4.
         Returns:     
-           list(dict): list of {id, name, parents}
+           generator(list(dict)): pages of {id, name, parents, size}
         """ 
         if not item_name and not parents:
             print('No rules specified, exiting...')
-            return None
-        # prepare query and item holder
-        page_token = None
-        item_list = []
+            return
         if item_name and parents:
             print('Please specify either ITEM_NAME or PARENTS, not both...')
-            return None
+            return
         elif item_name:
             query = "name='{}'".format(item_name)
         else:
             query = "'{}' in parents".format(parents)
-        # list files
-        while True:     
-            response = self.service.files().list(
-                        q = query,
-                        spaces = 'drive',        
-                        pageSize = 10,
-                        fields = "nextPageToken, files(id, name, parents, size)",
-                        pageToken = page_token
-                        ).execute()
-            items = response.get('files', [])
-            if not items:
-                print('No items found.')
-            else:
-                item_list += items
-            page_token = response.get('nextPageToken', None)
-            if page_token is None:
-                break
+        fields = list(fields)
+        if not recursive or item_name:
+            yield from self._iter_pages(query, fields, page_size)
+            return
+        if 'mimeType' not in fields:
+            fields.append('mimeType')
+        # each folder is listed in full by a worker, its sub-folders are
+        # queued as soon as it is done
+        with ThreadPoolExecutor(max_workers = workers) as executor:
+            futures = {executor.submit(self._list_folder, parents,
+                                       fields, page_size)}
+            while futures:
+                done, futures = wait(futures, return_when = FIRST_COMPLETED)
+                for future in done:
+                    for page in future.result():
+                        for item in page:
+                            if item.get('mimeType') == self.FOLDER_TYPE:
+                                futures.add(executor.submit(
+                                    self._list_folder, item['id'],
+                                    fields, page_size))
+                        yield(page)
+
+
+    def ListItems(self, item_name, parents,
+                  fields = ['id', 'name', 'parents', 'size'],
+                  page_size = 1000, recursive = False, workers = 4):
+        """List items (file/folder) by name or parents 
+        Parameters:     
+           item_name (str): name of file/folder. Can be None.
+           parents (str): target folder ID. Can be None.
+           fields (list(str)): file fields to fetch (API names).
+           page_size (int): max number of items per page, up to 1000.
+                            Default 1000.
+           recursive (bool): list the sub-folders of parents too.
+                             Default False.
+           workers (int): number of folders listed concurrently when
+                          recursive. Default 4.
+        Returns:     
+           list(dict): list of {id, name, parents, size}
+        """ 
+        if not item_name and not parents:
+            print('No rules specified, exiting...')
+            return None
+        if item_name and parents:
+            print('Please specify either ITEM_NAME or PARENTS, not both...')
+            return None
+        item_list = []
+        for page in self.IterItems(item_name, parents,
+                                   fields = fields,
+                                   page_size = page_size,
+                                   recursive = recursive,
+                                   workers = workers):
+            item_list += page
         print('Found {} items.'.format(len(item_list)))
         return(item_list)
 
 
-    def DownloadFile(self, download_path, file_name, file_id):
+    def _transient(self, resp, content):
+        # True if the request failed with an error worth retrying
+        if resp.status in self.RETRY_STATUS:
+            return(True)
+        if resp.status != 403:
+            return(False)
+        try:
+            errors = json.loads(content)['error']['errors']
+            return(any([x.get('reason') in self.RATE_LIMIT_REASONS
+                        for x in errors]))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return(False)
+
+
+    def _send(self, uri, method = 'GET', body = None, headers = None):
+        # (resp, content) of one request, transient errors are retried
+        # with backoff
+        for attempt in range(6):
+            try:
+                resp, content = self._http().request(uri, method,
+                                                     body = body,
+                                                     headers = headers)
+                if not self._transient(resp, content):
+                    return(resp, content)
+                error = HttpError(resp, content, uri = uri)
+            except (httplib2.HttpLib2Error, OSError) as e:
+                error = e
+            if attempt == 5:
+                raise error
+            wait = min(2 ** attempt, self.BACKOFF_MAX)
+            print('Retrying {} in {} s ({}).'.format(method, wait, error))
+            time.sleep(wait)
+
+
+    def _get_range(self, uri, start, end):
+        # (status, headers, content) of one ranged GET
+        resp, content = self._send(uri, headers = {
+                            'Range': 'bytes={}-{}'.format(start, end)})
+        return(resp.status, resp, content)
+
+
+    def DownloadFile(self, download_path, file_name, file_id, chunk_mb = 32):
         """Download a file from Google Drive to local disk
+        The file is streamed chunk by chunk to file_name + '.partial' and
+        renamed when it is complete, an interrupted download resumes from
+        the size of the partial file.
         Parameters:     
            download_path (str): path of the download folder
            file_name (str): name of the target file   
            file_id (str): ID of the target file
+           chunk_mb (int): size of each ranged request, the memory
+                           used. Default 32.
         Returns:     
            None
         """ 
@@ -139,30 +314,167 @@ class ConnectGoogleDrive:
             print('DOWNLOAD_PATH, FILE_NAME, and FILE_ID are needed.')
             return(None)
         download_path = self._check_path(download_path)
+        partial = download_path + file_name + '.partial'
+        chunk_size = int(chunk_mb * 1048576)
+        uri = self.service.files().get_media(fileId = file_id).uri
         # download file
-        request = self.service.files().get_media(fileId = file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        print('Downloading {}'.format(file_name))
-        while done is False:
-            status, done = downloader.next_chunk()
-            print("Download %d%%." % int(status.progress() * 100))
-        fh.seek(0)
-        # Write the received data to the file
-        with open(download_path + file_name, 'wb') as file: 
-            shutil.copyfileobj(fh, file)
+        offset = os.path.getsize(partial) if os.path.isfile(partial) else 0
+        if offset:
+            print('Resuming {} from {} bytes.'.format(file_name, offset))
+        else:
+            print('Downloading {}'.format(file_name))
+        size = None
+        with open(partial, 'ab') as file:
+            while size is None or offset < size:
+                status, resp, content = self._get_range(
+                                            uri, offset,
+                                            offset + chunk_size - 1)
+                if (status == 416 and resp.get('content-range', '')
+                                          .endswith('/{}'.format(offset))):
+                    # nothing left, the partial file is complete already
+                    # (or the file is empty)
+                    break
+                if status == 200:
+                    # the range was ignored, this is the whole file
+                    file.seek(0)
+                    file.truncate()
+                    file.write(content)
+                    break
+                if status != 206:
+                    raise HttpError(resp, content, uri = uri)
+                file.write(content)
+                offset += len(content)
+                size = int(resp['content-range'].rsplit('/', 1)[1])
+        os.replace(partial, download_path + file_name)
         print(download_path + file_name + ' is downloaded.')
         
         
-    def UploadFile(self, source_path, parents, file_name):
+    def _upload_progress(self, resp, content, uri):
+        # (offset, resource) of a resumable upload response, resource is
+        # None until the upload is complete
+        if resp.status in [200, 201]:
+            return(None, json.loads(content))
+        if resp.status != 308:
+            raise HttpError(resp, content, uri = uri)
+        if 'range' not in resp:
+            return(0, None)
+        return(int(resp['range'].rsplit('-', 1)[1]) + 1, None)
+
+
+    def _upload_status(self, uri, size):
+        # ask the session how many bytes it has
+        resp, content = self._send(uri, 'PUT', body = b'', headers = {
+                            'Content-Range': 'bytes */{}'.format(size)})
+        return(self._upload_progress(resp, content, uri))
+
+
+    def _open_session(self, file_path, file_metadata, session_path):
+        # resume the session saved in session_path if the file has not
+        # changed since, start a new one otherwise
+        size = os.path.getsize(file_path)
+        key = [size, os.path.getmtime(file_path), file_metadata['parents']]
+        if os.path.isfile(session_path):
+            with open(session_path) as file:
+                session = json.load(file)
+            if session['key'] == key:
+                try:
+                    offset, response = self._upload_status(session['uri'],
+                                                           size)
+                    return(session['uri'], offset, response)
+                except HttpError as e:
+                    if e.resp.status not in [404, 410]:
+                        raise
+                    print('Upload session has expired, restarting.')
+        request = self.service.files().create(
+                      body = file_metadata,
+                      media_body = MediaFileUpload(file_path,
+                                                   resumable = True),
+                      fields = 'id, name, parents')
+        headers = dict(request.headers)
+        headers['X-Upload-Content-Type'] = request.resumable.mimetype()
+        headers['X-Upload-Content-Length'] = str(size)
+        resp, content = self._send(request.uri, 'POST', body = request.body,
+                                   headers = headers)
+        if resp.status != 200:
+            raise HttpError(resp, content, uri = request.uri)
+        with open(session_path, 'w') as file:
+            json.dump({'uri': resp['location'], 'key': key}, file)
+        return(resp['location'], 0, None)
+
+
+    def _upload_resumable(self, file_path, file_metadata, session_path,
+                          chunk_mb):
+        # chunks of chunk_mb, or sized from the measured throughput so
+        # each one takes about CHUNK_SECONDS
+        size = os.path.getsize(file_path)
+        uri, offset, response = self._open_session(file_path, file_metadata,
+                                                   session_path)
+        if offset:
+            print('Resuming upload from {} bytes.'.format(offset))
+        if chunk_mb:
+            chunk_size = max(self.UPLOAD_UNIT,
+                             int(chunk_mb * 1048576) // self.UPLOAD_UNIT *
+                             self.UPLOAD_UNIT)
+        else:
+            chunk_size = self.CHUNK_START
+        failures = 0
+        with open(file_path, 'rb') as file:
+            while response is None:
+                file.seek(offset)
+                chunk = file.read(chunk_size)
+                start_time = time.perf_counter()
+                try:
+                    resp, content = self._http().request(
+                        uri, 'PUT', body = chunk, headers = {
+                            'Content-Range': 'bytes {}-{}/{}'.format(
+                                offset, offset + len(chunk) - 1, size)})
+                    if not self._transient(resp, content):
+                        sent, response = self._upload_progress(resp,
+                                                               content, uri)
+                        if response is None and not chunk_mb and sent > offset:
+                            rate = (sent - offset) / (time.perf_counter() -
+                                                      start_time)
+                            chunk_size = min(max(
+                                int(rate * self.CHUNK_SECONDS) //
+                                self.UPLOAD_UNIT * self.UPLOAD_UNIT,
+                                self.UPLOAD_UNIT), self.CHUNK_MAX,
+                                4 * chunk_size)
+                        offset = sent
+                        failures = 0
+                        continue
+                    error = HttpError(resp, content, uri = uri)
+                except (httplib2.HttpLib2Error, OSError) as e:
+                    error = e
+                failures += 1
+                if failures > 5:
+                    raise error
+                wait = min(2 ** failures, self.BACKOFF_MAX)
+                print('Retrying upload in {} s ({}).'.format(wait, error))
+                time.sleep(wait)
+                offset, response = self._upload_status(uri, size)
+        os.remove(session_path)
+        return(response)
+
+
+    def UploadFile(self, source_path, parents, file_name, chunk_mb = None,
+                   multipart_mb = 5):
         """Upload a file from local disk to Google Drive
+        Files up to multipart_mb are sent in one request. Larger files
+        are sent in chunks through a resumable session, saved in
+        source_path/.upload_sessions/ so an interrupted upload resumes
+        where it stopped, also after a restart.
         Parameters:     
            source_path (str): path of the source folder
            parents (str): ID of the target GD folder
            file_name (str): name of the target file   
+           chunk_mb (int): size of each chunk of a resumable upload,
+                           None sizes the chunks from the measured
+                           throughput (up to 128 MB, the memory used).
+                           Default None.
+           multipart_mb (int): largest file sent in one request.
+                               Default 5.
         Returns:     
-           None
+           dict: {id, name, parents}
         """ 
         if not source_path or not parents or not file_name:
             print('SOURCE_PATH, PARENTS, and FILE_NAME are needed.')
@@ -173,17 +485,26 @@ class ConnectGoogleDrive:
             'name': file_name,
             'parents': [parents]
         }
-        media = MediaFileUpload(source_path + file_name,
-                                chunksize=1048576,
-                                resumable=True)
         # upload file
         print('Uploading {}'.format(file_name))
-        response = self.service.files().create(
-                        body = file_metadata,
-                        media_body = media,
-                        fields = 'id, name, parents'
-                        ).execute()
+        if os.path.getsize(source_path + file_name) > multipart_mb * 1048576:
+            session_path = source_path + '.upload_sessions/'
+            os.makedirs(session_path, exist_ok = True)
+            response = self._upload_resumable(source_path + file_name,
+                                              file_metadata,
+                                              session_path + file_name +
+                                              '.json',
+                                              chunk_mb)
+        else:
+            media = MediaFileUpload(source_path + file_name,
+                                    resumable = False)
+            response = self.service.files().create(
+                            body = file_metadata,
+                            media_body = media,
+                            fields = 'id, name, parents'
+                            ).execute(http = self._http(), num_retries = 5)
         print('{} is uploaded.'.format(response['name']))
+        return(response)
 
 
     def DeleteFile(self, file_id):
@@ -197,7 +518,8 @@ class ConnectGoogleDrive:
             print('FIELD_ID is needed.')
             return(None)
         # delete file
-        _ = self.service.files().delete(fileId = file_id).execute()
+        _ = self.service.files().delete(fileId = file_id).execute(
+                                                    http = self._http())
         print('"{}" is deleted.'.format(file_id))
 
 
@@ -214,15 +536,146 @@ class ConnectGoogleDrive:
             return(None)
         # Retrieve the existing parents to remove
         response = self.service.files().get(fileId = file_id,
-                                         fields = 'parents').execute()
+                                         fields = 'parents').execute(
+                                             http = self._http())
         previous_parents = ",".join(response.get('parents'))
         # Move the file to the new folder
         response = self.service.files().update(fileId = file_id,
                                         addParents = new_parents,
                                         removeParents = previous_parents,
-                                        fields = 'id, name, parents').execute()
+                                        fields = 'id, name, parents').execute(
+                                            http = self._http())
         print('{} has been moved to {}.'.format(response['name'],
                                               response['parents']))
         
         
-        
\ No newline at end of file
+        
+
+
+    def _new_batch(self, callback):
+        if self._batch_uri:
+            return(BatchHttpRequest(callback = callback,
+                                    batch_uri = self._batch_uri))
+        return(self.service.new_batch_http_request(callback = callback))
+
+
+    def _run_batches(self, calls, max_retries = 5, missing_ok = False):
+        # calls are {key: function() -> HttpRequest}, sent BATCH_LIMIT per
+        # batch request, only the calls that failed with a transient error
+        # are sent again, with backoff. Returns {key: response}, None if
+        # the call failed.
+        results = {x: None for x in calls}
+        pending = list(calls)
+        for attempt in range(max_retries + 1):
+            retry = []
+            for i in range(0, len(pending), self.BATCH_LIMIT):
+                chunk = pending[i:i + self.BATCH_LIMIT]
+                
+                def callback(request_id, response, exception):
+                    key = chunk[int(request_id)]
+                    status = (exception.resp.status
+                              if isinstance(exception, HttpError) else None)
+                    if exception is None or (missing_ok and status == 404):
+                        results[key] = response or {}
+                    elif status and self._transient(exception.resp,
+                                                    exception.content):
+                        retry.append(key)
+                    else:
+                        print('Failed {}: {}'.format(key, exception))
+                
+                batch = self._new_batch(callback)
+                for j, key in enumerate(chunk):
+                    batch.add(calls[key](), request_id = str(j))
+                try:
+                    batch.execute(http = self._http())
+                except Exception as e:
+                    # the batch request failed as a whole
+                    print('Batch request failed ({}).'.format(e))
+                    retry += [x for x in chunk
+                              if results[x] is None and x not in retry]
+            pending = retry
+            if not pending or attempt == max_retries:
+                break
+            wait = min(2 ** attempt, self.BACKOFF_MAX)
+            print('Retrying {} calls in {} s.'.format(len(pending), wait))
+            time.sleep(wait)
+        for key in pending:
+            print('Failed {}: retries exhausted.'.format(key))
+        return(results)
+
+
+    def GetItems(self, file_ids, fields = ['id', 'name', 'parents']):
+        """Get the metadata of files/folders in batch requests
+        Parameters:   
+            file_ids (list(str)): IDs of the target items
+            fields (list(str)): file fields to fetch (API names).
+        Returns:     
+           dict: {file_id: {id, name, parents}, None if failed}
+        """ 
+        if not file_ids:
+            print('FILE_IDS is needed.')
+            return(None)
+        fields = ', '.join(fields)
+        # building files() is slow, once for all calls
+        files = self.service.files()
+        return(self._run_batches(
+                   {x: (lambda x = x: files.get(fileId = x,
+                                                fields = fields))
+                    for x in file_ids}))
+
+
+    def DeleteFiles(self, file_ids):
+        """Delete files from GD in batch requests
+        Parameters:   
+            file_ids (list(str)): IDs of the target files
+        Returns:     
+           dict: {file_id: True if deleted or not found, else False}
+        """ 
+        if not file_ids:
+            print('FILE_IDS is needed.')
+            return(None)
+        files = self.service.files()
+        results = self._run_batches(
+                      {x: (lambda x = x: files.delete(fileId = x))
+                       for x in file_ids}, missing_ok = True)
+        results = {x: y is not None for x, y in results.items()}
+        print('{} of {} files are deleted.'.format(
+                  list(results.values()).count(True), len(results)))
+        return(results)
+
+
+    def MoveFiles(self, file_ids, new_parents, old_parents = None):
+        """Move files from their GD folders to another in batch requests
+        Parameters:   
+            file_ids (list(str)): IDs of the target files
+            new_parents (str): ID of the destination GD folder
+            old_parents (str): ID of the folder the files are moved out
+                               of. Default None, the parents of each
+                               file are fetched first.
+        Returns:     
+           dict: {file_id: True if moved, else False}
+        """ 
+        if not file_ids or not new_parents:
+            print('FILE_IDS and NEW_PARENTS are needed.')
+            return(None)
+        if old_parents:
+            previous_parents = {x: old_parents for x in file_ids}
+        else:
+            previous_parents = {x: ','.join(y.get('parents', [])) for x, y
+                                in self.GetItems(file_ids,
+                                                 ['parents']).items()
+                                if y is not None}
+        files = self.service.files()
+        results = self._run_batches(
+                      {x: (lambda x = x: files.update(
+                                            fileId = x,
+                                            addParents = new_parents,
+                                            removeParents =
+                                                previous_parents[x],
+                                            fields = 'id, parents'))
+                       for x in file_ids if x in previous_parents})
+        results = {x: results.get(x) is not None for x in file_ids}
+        print('{} of {} files are moved to {}.'.format(
+                  list(results.values()).count(True), len(results),
+                  new_parents))
+        return(results)
@@ -11,30 +11,226 @@ ftplib reference:
 """
 
 ## Set environment ------------------------------------------------------------
-from ftplib import FTP_TLS, error_perm
+import os
+import ssl
+import time
+import socket
+import queue
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from ftplib import FTP, FTP_TLS, error_perm, error_temp
 
 ## Define class ---------------------------------------------------------------
 class ConnectSFTP:
     """Object that connects SFTP
+    Keeps a pool of up to pool_size logged-in sessions, each call borrows
+    one, so the object can be shared by threads.
     Functions:
         .CreateFolder(sftp_path)
-        .ListFiles(sftp_path)
+        .ListFiles(sftp_path, details = False)
         .DownloadFile(sftp_path, download_path, file_name)
-        .UploadFile(sftp_path, source_path, file_name)
+        .UploadFile(sftp_path, source_path, file_name, resume = False)
+        .DownloadFiles(sftp_path, download_path, file_list,
+                       workers = None)
+        .UploadFiles(sftp_path, source_path, file_list,
+                     workers = None)
         .DeleteFile(sftp_path, file_name)
         .MoveFile(from_sftp_path, to_sftp_path, file_name)
+        .Close()
     """
     
-    def __init__(self, sftp_host, sftp_username, sftp_passwd):
+    TIMEOUT = 60
+    BACKOFF_MAX = 60 # max seconds between retries of a transfer
+    # the session was dropped (e.g. 421 idle timeout), reconnect and retry,
+    # error_temp only for 421
+    LOST_ERRORS = (EOFError, ConnectionError, socket.timeout,
+                   ssl.SSLError, error_temp)
+    
+    def __init__(self, sftp_host, sftp_username, sftp_passwd,
+                 sftp_port = 21, pool_size = 1, use_tls = True,
+                 keepalive = 60, debugging = 0, blocksize = 262144,
+                 max_retries = 5, cache_ttl = 30):
+        """
+        Parameters: 
+            sftp_host (str): host name of the server.
+            sftp_username (str): user name.
+            sftp_passwd (str): password.
+            sftp_port (int): port of the server. Default 21.
+            pool_size (int): max number of sessions, they are opened
+                             when needed. Default 1.
+            use_tls (bool): FTP over TLS or plain FTP. Default True.
+            keepalive (int): sessions idle for this many seconds are
+                             sent a NOOP in the background, so the
+                             server's idle timeout does not drop them.
+                             0 disables it. Default 60.
+            debugging (int): ftplib debug level, 2 logs every command.
+                             Default 0.
+            blocksize (int): bytes per read/write of a transfer.
+                             Default 256 KiB.
+            max_retries (int): number of times an interrupted transfer
+                               is resumed, with backoff. Default 5.
+            cache_ttl (int): seconds a folder listing is reused, our own
+                             changes to the folder drop it. 0 disables
+                             the cache. Default 30.
+        """
         if not sftp_host or not sftp_username or not sftp_passwd:
             print('SFTP_HOST, USERNAME, and PASSWORD are needed.')
             return(None)
-        self.ftp = FTP_TLS(sftp_host)
-        self.ftp.debugging = 2
-        self.ftp.login(sftp_username, sftp_passwd)
+        self.login = (sftp_host, sftp_port, sftp_username, sftp_passwd)
+        self.pool_size = max(1, pool_size)
+        self.use_tls = use_tls
+        self.keepalive = keepalive
+        self.debugging = debugging
+        self.blocksize = blocksize
+        self.max_retries = max_retries
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._use_mlsd = True
+        self._pool = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = threading.Event()
+        self._keepalive_lock = threading.Lock()
+        self._release(self._open())
+        if keepalive:
+            threading.Thread(target = self._keep_alive,
+                             daemon = True).start()
         print('Connected to SFTP.')
 
 
+    def _open(self):
+        # log in a new session if the pool is not full, None otherwise
+        with self._lock:
+            if self._opened >= self.pool_size:
+                return(None)
+            self._opened += 1
+        try:
+            host, port, username, passwd = self.login
+            ftp = FTP_TLS() if self.use_tls else FTP()
+            ftp.connect(host, port, timeout = self.TIMEOUT)
+            ftp.debugging = self.debugging
+            ftp.login(username, passwd)
+            return(ftp)
+        except BaseException:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+
+    def _discard(self, ftp):
+        try:
+            ftp.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._opened -= 1
+
+
+    def _acquire(self, check = False):
+        # idle session first, a new one while the pool is not full,
+        # otherwise wait for a session to be released
+        try:
+            ftp, last_used = self._pool.get_nowait()
+        except queue.Empty:
+            ftp = self._open()
+            if ftp is not None:
+                return(ftp)
+            ftp, last_used = self._pool.get()
+        if check or time.monotonic() - last_used > self.keepalive:
+            try:
+                ftp.voidcmd('NOOP')
+            except self.LOST_ERRORS + (OSError,):
+                self._discard(ftp)
+                return(self._acquire(check))
+        return(ftp)
+
+
+    def _release(self, ftp):
+        self._pool.put((ftp, time.monotonic()))
+
+
+    def _keep_alive(self):
+        # NOOP the sessions idle for keepalive seconds, they are out of
+        # the pool meanwhile, so a busy session is never sent a NOOP
+        while not self._closed.wait(self.keepalive / 2):
+            with self._keepalive_lock:
+                idle = []
+                while True:
+                    try:
+                        idle.append(self._pool.get_nowait())
+                    except queue.Empty:
+                        break
+                expired = [x for x, y in idle
+                           if time.monotonic() - y >= self.keepalive]
+                # the others go back in the same (LIFO) order
+                for ftp, last_used in reversed(idle):
+                    if ftp not in expired:
+                        self._pool.put((ftp, last_used))
+                for ftp in expired:
+                    try:
+                        ftp.voidcmd('NOOP')
+                    except self.LOST_ERRORS + (OSError,):
+                        self._discard(ftp)
+                        continue
+                    self._release(ftp)
+
+
+    def _run(self, function):
+        # run function(ftp) on a pooled session, once more on a checked
+        # session if it was lost (idle sessions were likely lost too)
+        ftp = self._acquire()
+        try:
+            result = function(ftp)
+        except self.LOST_ERRORS as e:
+            if isinstance(e, error_temp) and str(e)[:3] != '421':
+                self._release(ftp)
+                raise
+            print('SFTP session lost ({}), reconnecting.'.format(e))
+            self._discard(ftp)
+            ftp = self._acquire(check = True)
+            try:
+                return(function(ftp))
+            finally:
+                self._release(ftp)
+        except BaseException:
+            self._release(ftp)
+            raise
+        self._release(ftp)
+        return(result)
+
+
+    def _retry(self, function, name):
+        # run function(ftp) until it succeeds, transient errors (and 551)
+        # are retried with bounded exponential backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                return(self._run(function))
+            except error_perm as reason:
+                if (str(reason)[:3] != '551' or
+                    attempt == self.max_retries):
+                    print(reason)
+                    raise IOError(reason)
+                error = reason
+            except self.LOST_ERRORS as e:
+                if attempt == self.max_retries:
+                    print(e)
+                    raise IOError(e)
+                error = e
+            wait = min(2 ** attempt, self.BACKOFF_MAX)
+            print('Retrying {} in {} s ({}).'.format(name, wait, error))
+            time.sleep(wait)
+
+
+    def _remote_size(self, ftp, path):
+        # None if the file is missing or SIZE is not supported
+        try:
+            ftp.voidcmd('TYPE I')
+            return(ftp.size(path))
+        except error_perm:
+            return(None)
+
+
     def _check_path(self, path, is_sftp_path):
         if path[-1] != '/':
             path = path + '/'
@@ -44,10 +240,71 @@ class ConnectSFTP:
             path = '/' + path
         return(path)
 
+    def _parse_facts(self, facts):
+        modify = facts.get('modify')
+        if modify:
+            modify = datetime.strptime(modify[:14], '%Y%m%d%H%M%S')
+        size = facts.get('size')
+        return({'size': int(size) if size is not None else None,
+                'modify': modify,
+                'type': facts.get('type')})
+
+
+    def _list_folder(self, sftp_path):
+        # {name: {size, modify (UTC), type}} of a folder in one MLSD round
+        # trip, reused for cache_ttl seconds. Without MLSD, names only.
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(sftp_path)
+        if cached and now - cached[0] < self.cache_ttl:
+            return(cached[1])
+        items = None
+        if self._use_mlsd:
+            try:
+                items = {x: self._parse_facts(y) for x, y in
+                         self._run(lambda ftp: list(ftp.mlsd(sftp_path,
+                                   facts = ['type', 'size', 'modify'])))
+                         if y.get('type') not in ['cdir', 'pdir']}
+            except error_perm as reason:
+                if str(reason)[:3] not in ['500', '502', '504']:
+                    raise
+                self._use_mlsd = False
+        if items is None:
+            # some servers return full paths for NLST of a path
+            items = {x.rsplit('/', 1)[-1]: {'size': None,
+                                            'modify': None,
+                                            'type': None}
+                     for x in self._run(lambda ftp: ftp.nlst(sftp_path))}
+        if self.cache_ttl:
+            with self._lock:
+                self._cache[sftp_path] = (now, items)
+        return(items)
+
+
+    def _invalidate(self, *sftp_paths):
+        with self._lock:
+            for sftp_path in sftp_paths:
+                self._cache.pop(sftp_path, None)
+
+
     def _check_wd(self, path):
+        # look the folder up in the (cached) listing of its parent
+        path = path.rstrip('/')
+        if not path:
+            return True
+        parent, name = path.rsplit('/', 1)
         try:
-            resp = self.ftp.sendcmd('MLST ' + path)
-            if 'Type=dir' in resp:
+            item = self._list_folder(parent + '/').get(name)
+        except error_perm:
+            return False
+        if item is None:
+            return False
+        if item['type'] is not None:
+            return item['type'] == 'dir'
+        # names only (no MLSD), ask the server
+        try:
+            resp = self._run(lambda ftp: ftp.sendcmd('MLST ' + path))
+            if 'type=dir' in resp.lower():
                 return True
             else:
                 return False
@@ -67,29 +324,37 @@ class ConnectSFTP:
             return(None)
         sftp_path = self._check_path(sftp_path, True)
         if self._check_wd(sftp_path) == False:
-            self.ftp.mkd(sftp_path)
+            self._run(lambda ftp: ftp.mkd(sftp_path))
+            self._invalidate(sftp_path.rstrip('/').rsplit('/', 1)[0] + '/')
             print(sftp_path + ' is created.')
 
 
-    def ListFiles(self, sftp_path):
+    def ListFiles(self, sftp_path, details = False):
         """List files in sftp_path
         Parameters:     
            sftp_path (str): path of the SFTP folder
+           details (bool): return the size, modify time and type too
         Returns:     
-           list(str): list of file names
+           list(str): list of file names, or
+           list(dict): [{name, size, modify (datetime, UTC), type}]
+                       if details, all None but name without MLSD
         """ 
         if not sftp_path:
             print('SFTP_PATH is needed.')
             return(None)
         sftp_path = self._check_path(sftp_path, True)
-        self.ftp.cwd(sftp_path)
-        file_list = self.ftp.nlst()
-        file_list.sort()
+        items = self._list_folder(sftp_path)
+        file_list = sorted(items)
+        if details:
+            return([dict(name = x, **items[x]) for x in file_list])
         return(file_list)
 
 
     def DownloadFile(self, sftp_path, download_path, file_name):
         """Download a file from sftp to local disk
+        The file is written to file_name + '.partial' and renamed when it
+        is complete, an interrupted download resumes from the size of the
+        partial file (REST).
         Parameters:     
            sftp_path (str): path of the SFTP folder
            download_path (str): path of the download folder
@@ -102,29 +367,37 @@ class ConnectSFTP:
             return(None)
         sftp_path = self._check_path(sftp_path, True)
         download_path = self._check_path(download_path, False)
-        self.ftp.cwd(sftp_path)
-        retry = True
-        while retry:
-            retry = False
-            try:
-                with open(download_path + file_name, 'wb') as file:
-                    self.ftp.retrbinary('RETR %s' % file_name, file.write)
-            except error_perm as reason:
-                if str(reason)[:3] != '551':
-                    print(reason)
-                    raise IOError
-                else:
-                    retry = True
-                    continue
+        partial = download_path + file_name + '.partial'
+        
+        def retrieve(ftp):
+            size = self._remote_size(ftp, sftp_path + file_name)
+            offset = os.path.getsize(partial) if os.path.isfile(partial) else 0
+            if size is None or offset > size:
+                offset = 0
+            with open(partial, 'ab' if offset else 'wb') as file:
+                if size is None or offset < size:
+                    ftp.retrbinary('RETR %s' % (sftp_path + file_name),
+                                   file.write, blocksize = self.blocksize,
+                                   rest = offset or None)
+            if size is not None and os.path.getsize(partial) != size:
+                raise EOFError('incomplete download, {} of {} bytes'.format(
+                                   os.path.getsize(partial), size))
+        
+        self._retry(retrieve, file_name)
+        os.replace(partial, download_path + file_name)
         print(download_path + file_name + ' is downloaded.')
 
 
-    def UploadFile(self, sftp_path, source_path, file_name):
+    def UploadFile(self, sftp_path, source_path, file_name, resume = False):
         """Upload a file from local disk to SFTP
+        A retried upload resumes from the size of the remote file (APPE,
+        or REST + STOR if APPE is not supported).
         Parameters:     
            sftp_path (str): path of the SFTP folder
            source_path (str): path of the source folder
            file_name (str): name of the target file    
+           resume (bool): resume a remote file left by an earlier
+                          upload instead of replacing it. Default False.
         Returns:     
            None
         """ 
@@ -133,23 +406,101 @@ class ConnectSFTP:
             return(None)
         sftp_path = self._check_path(sftp_path, True)
         source_path = self._check_path(source_path, False)
-        self.ftp.cwd(sftp_path)
-        retry = True
-        while retry:
-            retry = False
-            try:
-                with open(source_path + file_name, 'rb') as file:
-                    self.ftp.storbinary('STOR %s' % file_name, file)
-            except error_perm as reason:
-                if str(reason)[:3] != '551':
-                    print(reason)
-                    raise IOError
-                else:
-                    retry = True
-                    continue
+        path = sftp_path + file_name
+        size = os.path.getsize(source_path + file_name)
+        state = {'resume': resume}
+        
+        def store(ftp):
+            offset = 0
+            if state['resume']:
+                offset = self._remote_size(ftp, path) or 0
+                if offset > size:
+                    offset = 0
+            # anything on the server from now on is from this upload
+            state['resume'] = True
+            with open(source_path + file_name, 'rb') as file:
+                if not offset:
+                    ftp.storbinary('STOR %s' % path, file,
+                                   blocksize = self.blocksize)
+                elif offset < size:
+                    file.seek(offset)
+                    try:
+                        ftp.storbinary('APPE %s' % path, file,
+                                       blocksize = self.blocksize)
+                    except error_perm as reason:
+                        if str(reason)[:3] not in ['500', '502', '504']:
+                            raise
+                        file.seek(offset)
+                        ftp.storbinary('STOR %s' % path, file,
+                                       blocksize = self.blocksize,
+                                       rest = offset)
+            remote_size = self._remote_size(ftp, path)
+            if remote_size is not None and remote_size != size:
+                raise EOFError('incomplete upload, {} of {} bytes'.format(
+                                   remote_size, size))
+        
+        try:
+            self._retry(store, file_name)
+        finally:
+            self._invalidate(sftp_path)
         print(sftp_path + file_name + ' is uploaded.')
 
 
+    def _transfer_files(self, transfer, file_list, workers):
+        # spread the files across the pool, {file_name: success}
+        def run(file_name):
+            try:
+                transfer(file_name)
+                return(True)
+            except Exception as e:
+                print('Failed {}: {}'.format(file_name, e))
+                return(False)
+        
+        with ThreadPoolExecutor(max_workers =
+                                workers or self.pool_size) as executor:
+            return(dict(zip(file_list, executor.map(run, file_list))))
+
+
+    def DownloadFiles(self, sftp_path, download_path, file_list,
+                      workers = None):
+        """Download files from sftp to local disk on the session pool
+        Parameters:     
+           sftp_path (str): path of the SFTP folder
+           download_path (str): path of the download folder
+           file_list (list(str)): names of the target files
+           workers (int): number of concurrent downloads.
+                          Default None, pool_size.
+        Returns:     
+           dict: {file_name: True if downloaded, else False}
+        """ 
+        if not sftp_path or not download_path or not file_list:
+            print('SFTP_PATH, DOWNLOAD_PATH, and FILE_LIST are needed.')
+            return(None)
+        return(self._transfer_files(
+                   lambda x: self.DownloadFile(sftp_path, download_path, x),
+                   file_list, workers))
+
+
+    def UploadFiles(self, sftp_path, source_path, file_list,
+                    workers = None):
+        """Upload files from local disk to SFTP on the session pool
+        Parameters:     
+           sftp_path (str): path of the SFTP folder
+           source_path (str): path of the source folder
+           file_list (list(str)): names of the target files
+           workers (int): number of concurrent uploads.
+                          Default None, pool_size.
+        Returns:     
+           dict: {file_name: True if uploaded, else False}
+        """ 
+        if not sftp_path or not source_path or not file_list:
+            print('SFTP_PATH, SOURCE_PATH, and FILE_LIST are needed.')
+            return(None)
+        return(self._transfer_files(
+                   lambda x: self.UploadFile(sftp_path, source_path, x),
+                   file_list, workers))
+
+
     def DeleteFile(self, sftp_path, file_name):
         """Delete a file from SFTP
         Parameters:     
@@ -162,7 +513,8 @@ class ConnectSFTP:
             print('SFTP_PATH and FILE_NAME are needed.')
             return(None)
         sftp_path = self._check_path(sftp_path, True)
-        self.ftp.delete(sftp_path + file_name)
+        self._run(lambda ftp: ftp.delete(sftp_path + file_name))
+        self._invalidate(sftp_path)
         print(sftp_path + file_name + ' is deleted.')
 
 
@@ -180,10 +532,30 @@ class ConnectSFTP:
             return(None)
         from_sftp_path = self._check_path(from_sftp_path, True)
         to_sftp_path = self._check_path(to_sftp_path, True)
-        self.ftp.rename(from_sftp_path + file_name,
-                        to_sftp_path + file_name)
+        self._run(lambda ftp: ftp.rename(from_sftp_path + file_name,
+                                         to_sftp_path + file_name))
+        self._invalidate(from_sftp_path, to_sftp_path)
         print(file_name + ' is movded to ' + to_sftp_path)
 
+
+    def Close(self):
+        """Log out of all sessions
+        Returns:     
+           None
+        """ 
+        self._closed.set()
+        with self._keepalive_lock: # sessions being kept alive are back
+            while True:
+                try:
+                    ftp, _ = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    ftp.quit()
+                except Exception:
+                    pass
+                self._discard(ftp)
+
         
 ## main -----------------------------------------------------------------------
 if __name__ == "__main__":
@@ -6,25 +6,43 @@ Created on Wed Jan 27 10:54:44 2021
 
 Move files from Google Drive folder to local folder
 """
-token_path = '/home/jccit_caltech_edu/tokens/token.pickle'
+
+## Set environment ------------------------------------------------------------
+import os
+from concurrent.futures import ThreadPoolExecutor
 from spike.DataTools import ConnectGoogleDrive
+from spike.DataTools.TransferSummary import TransferSummary
 
-def DownloadFolderFromGD(token_path, download_path, gd_folder):
-    """Move files from local folder to Google Drive
+## Define function ------------------------------------------------------------
+def DownloadFolderFromGD(token_path, download_path, gd_folder, workers = 4):
+    """Move files from Google Drive folder to local folder
+    Local files with the same size and md5 are skipped, downloaded files
+    are checked against the md5 of Google Drive.
     Parameters: 
         token_path (str): path to the GD token.
         download_path (str): path to the download folder.
         gd_folder (str): name of the GD folder.
+        workers (int): number of concurrent downloads. Default 4.
     Returns:     
-       None
+       dict: {files, skipped, failed, bytes, seconds, mb_per_sec},
+             failed is the list of files that are not downloaded.
     """ 
+    summary = TransferSummary('download')
     google_drive = ConnectGoogleDrive(token_path)
+    download_path = google_drive._check_path(download_path)
     item_list = google_drive.ListItems(gd_folder, None)
     if len(item_list) > 1:
         print('Found multiple GD folders, Please rename the folder.')
         return(None)
+    if len(item_list) == 0:
+        print('GD folder {} is not found.'.format(gd_folder))
+        return(None)
     folder_id = item_list[0]['id']
-    item_list = google_drive.ListItems(None, folder_id)
+    item_list = google_drive.ListItems(None, folder_id,
+                                       fields = ['id', 'name', 'size',
+                                                 'md5Checksum', 'mimeType'])
+    item_list = [x for x in item_list
+                 if x.get('mimeType') != google_drive.FOLDER_TYPE]
     if len(item_list) == 0:
         print('There is no files to download. Exiting...')
         return(None)
@@ -32,6 +50,30 @@ def DownloadFolderFromGD(token_path, download_path, gd_folder):
     print('\nDownload List:')
     print('\n'.join(file_list))
     print('')
-    
-    for item in item_list:
-        google_drive.DownloadFile(download_path, item['name'], item['id'])
\ No newline at end of file
+    os.makedirs(download_path, exist_ok = True)
+
+    def download(item):
+        file_path = download_path + item['name']
+        size = int(item.get('size', 0))
+        # skip files that are already downloaded
+        if (os.path.isfile(file_path) and
+            os.path.getsize(file_path) == size and
+            item.get('md5Checksum') == google_drive._file_md5(file_path)):
+            summary.Skip()
+            return
+        try:
+            google_drive.DownloadFile(download_path, item['name'],
+                                      item['id'])
+            if (item.get('md5Checksum') and
+                item['md5Checksum'] != google_drive._file_md5(file_path)):
+                os.remove(file_path)
+                raise ValueError('checksum mismatch')
+        except Exception as e:
+            summary.Fail(item['name'], e)
+            return
+        summary.Done(size)
+
+    # DownloadFile sends its requests through a per-thread authorized Http
+    with ThreadPoolExecutor(max_workers = workers) as executor:
+        list(executor.map(download, item_list))
+    return(summary.Finish())
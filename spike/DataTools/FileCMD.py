@@ -9,7 +9,18 @@ File Commands (mkdir, list, move, delete, zip, unzip)
 
 ## Set environment ------------------------------------------------------------
 import os
+import tarfile
+import zipfile
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import zstandard
+except ImportError: # optional, needed by zip_type = 'tar.zst'
+    zstandard = None
+try:
+    import pyzipper
+except ImportError: # optional, needed by encrypted zip_type = 'zip'
+    pyzipper = None
 
 ## Define class ---------------------------------------------------------------
 class FileCMD:
@@ -21,11 +32,23 @@ class FileCMD:
         .DeleteFile(self, folder_path, file_name)
         .ZipFile(self, source_path, output_path,
                 file_name, remove_raw = False,
-                password = None, zip_type = '7z')
+                password = None, zip_type = '7z',
+                verbose = True)
         .ZipFolder(self, source_path, output_path,
               pattern = '', remove_raw = False,
-              password = None, zip_type = '7z')
+              password = None, zip_type = '7z',
+              workers = None)
+        .UnzipFile(self, source_path, output_path,
+                file_name, remove_raw = False,
+                password = None, zip_type = '7z',
+                verbose = True)
+        .ZipName(self, file_name, zip_type = '7z')
     """
+
+    ZIP_EXTENSIONS = {'7z': '.7z', 'zip': '.zip', 'zip_lzma': '.zip',
+                      'tar.gz': '.tar.gz', 'tar.xz': '.tar.xz',
+                      'tar.zst': '.tar.zst'}
+    CHUNK_SIZE = 1048576
     
     def __init__(self):
         print('FileCMD is ready.')
@@ -71,8 +94,10 @@ class FileCMD:
         folder_path = self._check_path(folder_path)
         if pattern is None:
             pattern = ''
-        file_list = [x for x in os.listdir(folder_path) if
-                     (pattern in x) and os.path.isfile(folder_path + x)]
+        # scandir reads the file type from the directory entry, no stat
+        with os.scandir(folder_path) as entries:
+            file_list = [x.name for x in entries if
+                         (pattern in x.name) and x.is_file()]
         file_list.sort()
         return(file_list)
 
@@ -116,9 +141,106 @@ class FileCMD:
             print(folder_path + file_name + ' is deleted')
 
 
+    def ZipName(self, file_name, zip_type = '7z'):
+        """Name of the zip file that ZipFile creates
+        Parameters:     
+           file_name (str): name of the target file.
+           zip_type (str): see ZipFile. Default 7z.
+        Returns:     
+           str: name of the zip file.
+        """ 
+        return(file_name.rsplit('.', 1)[0] +
+               self.ZIP_EXTENSIONS[zip_type.lower()])
+
+
+    def _archive(self, source_file, output_file, zip_type, password):
+        # in-process archive engines, the file is streamed in chunks
+        arc_name = os.path.basename(source_file)
+        if zip_type.startswith('zip'):
+            method = zipfile.ZIP_DEFLATED
+            if zip_type == 'zip_lzma':
+                method = zipfile.ZIP_LZMA
+            if password is None:
+                archive = zipfile.ZipFile(output_file, 'w',
+                                          compression = method)
+            else:
+                archive = pyzipper.AESZipFile(output_file, 'w',
+                                              compression = method,
+                                              encryption = pyzipper.WZ_AES)
+                archive.setpassword(password.encode('utf-8'))
+            with archive:
+                archive.write(source_file, arc_name)
+        elif zip_type == 'tar.zst':
+            with open(output_file, 'wb') as raw, \
+                 zstandard.ZstdCompressor().stream_writer(
+                     raw, closefd = False) as writer, \
+                 tarfile.open(fileobj = writer, mode = 'w|',
+                              bufsize = self.CHUNK_SIZE) as tar:
+                tar.add(source_file, arc_name)
+        else:
+            kwargs = {'compresslevel': 6} if zip_type == 'tar.gz' else {}
+            with tarfile.open(output_file,
+                              'w:' + zip_type.split('.')[1], **kwargs) as tar:
+                tar.add(source_file, arc_name)
+
+
+    def _extract(self, source_file, output_path, zip_type, password):
+        if zip_type.startswith('zip'):
+            if pyzipper is not None:
+                archive = pyzipper.AESZipFile(source_file)
+            else:
+                archive = zipfile.ZipFile(source_file)
+            with archive:
+                if password is not None:
+                    archive.setpassword(password.encode('utf-8'))
+                archive.extractall(output_path)
+            return
+        kwargs = {}
+        if hasattr(tarfile, 'data_filter'):
+            kwargs['filter'] = 'data'
+        if zip_type == 'tar.zst':
+            with open(source_file, 'rb') as raw, \
+                 zstandard.ZstdDecompressor().stream_reader(raw) as reader, \
+                 tarfile.open(fileobj = reader, mode = 'r|',
+                              bufsize = self.CHUNK_SIZE) as tar:
+                tar.extractall(output_path, **kwargs)
+        else:
+            with tarfile.open(source_file, 'r:*') as tar:
+                tar.extractall(output_path, **kwargs)
+
+
+    def _run_7z(self, command, file_name, verbose):
+        # 7z exits with 1 for warnings (e.g. a file locked or changed while
+        # read), the archive is still written. 2 and above are errors.
+        stdout = None if verbose else subprocess.DEVNULL
+        status = subprocess.call(command, stdout = stdout)
+        if status == 1:
+            print('7z reported warnings for ' + file_name)
+        return(status < 2)
+
+
+    def _check_zip_type(self, zip_type, password):
+        if zip_type not in self.ZIP_EXTENSIONS:
+            print('ZIP_TYPE {} is not supported.'.format(zip_type))
+            return(False)
+        if zip_type == 'tar.zst' and zstandard is None:
+            print('ZIP_TYPE tar.zst needs the zstandard package.')
+            return(False)
+        if password is not None and zip_type.startswith('tar'):
+            print('ZIP_TYPE {} does not support passwords.'.format(zip_type))
+            return(False)
+        if (password is not None and zip_type.startswith('zip') and
+            pyzipper is None):
+            print('Encrypted ZIP_TYPE {} needs the pyzipper package.'
+                  .format(zip_type))
+            return(False)
+        return(True)
+
+
     def ZipFile(self, source_path, output_path,
                 file_name, remove_raw = False,
-                password = None, zip_type = '7z'):
+                password = None, zip_type = '7z',
+                verbose = True):
         """Zip a file
         Parameters:     
            source_path (str): path of the source folder.
@@ -126,36 +248,68 @@ class FileCMD:
            file_name (str): name of the target file.
            remove_raw (bool): remove the raw file or not.
            password (str): password of the 7z/zip file.
-           zip_type (str): 7z/zip. currently supports 7z.
+           zip_type (str): 7z/zip/zip_lzma/tar.gz/tar.xz/tar.zst.
+                           7z runs the 7z binary, the others run
+                           in-process. Default 7z.
+           verbose (bool): print messages and 7z output or not.
         Returns:     
-           None
+           bool: True if the file is zipped.
         """ 
         if not source_path or not output_path or not file_name:
             print('SOURCE_PATH, OUTPUT_PATH, and FILE_NAME are needed.')
-            return(None)
+            return(False)
         source_path = self._check_path(source_path)
         output_path = self._check_path(output_path)
-        if not os.path.isfile(source_path + file_name):
-            print(source_path + file_name + ' does not exist.')
-            return(None)
-        if not os.path.exists(output_path):
-            print('Output folder {} does not exist.'.format(output_path))
-            return(None)
-        if '7z' in zip_type.lower():
-            output_name = file_name.rsplit('.', 1)[0] + '.7z'
+        if not source_path or not os.path.isfile(source_path + file_name):
+            print(str(source_path) + file_name + ' does not exist.')
+            return(False)
+        if not output_path:
+            print('Output folder does not exist.')
+            return(False)
+        zip_type = zip_type.lower()
+        if not self._check_zip_type(zip_type, password):
+            return(False)
+        output_name = self.ZipName(file_name, zip_type)
+        if zip_type == '7z':
             command = ['7z', 'a', output_path + output_name,
                        source_path + file_name]
             if password is not None:
                 command.append('-p{}'.format(password))
-            subprocess.call(command)
-            if remove_raw:
-                self.DeleteFile(source_path, file_name)
-        print(file_name + ' is zipped.')
+            if not self._run_7z(command, file_name, verbose):
+                print('Failed zipping ' + file_name)
+                return(False)
+        else:
+            # write to .partial so a crash never leaves a truncated archive
+            partial_file = output_path + output_name + '.partial'
+            try:
+                self._archive(source_path + file_name, partial_file,
+                              zip_type, password)
+            except Exception as e:
+                print('Failed zipping {}: {}'.format(file_name, e))
+                if os.path.isfile(partial_file):
+                    os.remove(partial_file)
+                return(False)
+            os.replace(partial_file, output_path + output_name)
+        if remove_raw:
+            self.DeleteFile(source_path, file_name, verbose = verbose)
+        if verbose:
+            print(file_name + ' is zipped.')
+        return(True)
+
+
+    def _zip_file_safely(self, *args, **kwargs):
+        # runs in the worker processes of ZipFolder
+        try:
+            return(self.ZipFile(*args, **kwargs))
+        except Exception as e:
+            print('Failed zipping {}: {}'.format(args[2], e))
+            return(False)
 
 
     def ZipFolder(self, source_path, output_path,
               pattern = '', remove_raw = False,
-              password = None, zip_type = '7z'):
+              password = None, zip_type = '7z',
+              workers = None, file_list = None):
         """Zip files in a folder
         Parameters:     
            source_path (str): path of the source folder.
@@ -163,60 +317,94 @@ class FileCMD:
            pattern (str): used to filter files.
            remove_raw (bool): remove the raw files or not.
            password (str): password of the 7z/zip file.
-           zip_type (str): 7z/zip. Default 7z.
+           zip_type (str): 7z/zip/zip_lzma/tar.gz/tar.xz/tar.zst.
+                           Default 7z.
+           workers (int): number of files zipped concurrently.
+                           Default None, the number of CPUs.
+           file_list (list(str)): files to zip. Default None, every
+                                  file matching pattern.
         Returns:     
-           None
+           dict: {file_name: True if zipped, False if failed}
         """ 
         if not source_path or not output_path:
             print('SOURCE_PATH and OUTPUT_PATH are needed.')
             return(None)
-        file_list = self.ListFiles(source_path, pattern)
-        if len(file_list) == 0:
-            print('No files in folder {' + source_path +
-                   '} need to be zipped.')
+        if file_list is None:
+            file_list = self.ListFiles(source_path, pattern)
+        if file_list is None:
             return(None)
-        for file_name in file_list:
-            self.ZipFile(source_path,
-                         output_path,
-                         file_name,
-                         remove_raw = remove_raw,
-                         password = password,
-                         zip_type = zip_type)
-        print('Files in folder {' + source_path + '} are zipped')
+        # skip files that are still being written
+        file_list = [x for x in file_list if not x.endswith('.partial')]
+        if len(file_list) == 0:
+            return({})
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(file_list)))
+        if workers == 1:
+            results = [self._zip_file_safely(source_path, output_path,
+                                              file_name, remove_raw,
+                                              password, zip_type, False)
+                       for file_name in file_list]
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                futures = [executor.submit(self._zip_file_safely,
+                                           source_path, output_path,
+                                           file_name, remove_raw,
+                                           password, zip_type, False)
+                           for file_name in file_list]
+                results = [x.result() for x in futures]
+        return(dict(zip(file_list, results)))
 
 
     def UnzipFile(self, source_path, output_path,
                 file_name, remove_raw = False,
-                password = None, zip_type = '7z'):
+                password = None, zip_type = '7z',
+                verbose = True):
         """Unzip a file
         Parameters:     
            source_path (str): path of the source folder.
            output_path (str): path of the output folder.
            file_name (str): name of the target file.
            password (str): password of the 7z/zip file.
-           zip_type (str): 7z/zip. Default 7z.
+           zip_type (str): 7z/zip/zip_lzma/tar.gz/tar.xz/tar.zst.
+                           Default 7z.
+           verbose (bool): print messages and 7z output or not.
         Returns:     
-           None
+           bool: True if the file is unzipped.
         """ 
         if not source_path or not output_path or not file_name:
             print('SOURCE_PATH, OUTPUT_PATH, and FILE_NAME are needed.')
-            return(None)
+            return(False)
         source_path = self._check_path(source_path)
         output_path = self._check_path(output_path)
-        if not os.path.isfile(source_path + file_name):
-            print(source_path + file_name + ' does not exist.')
-            return(None)
-        if not os.path.exists(output_path):
-            print('Output folder {} does not exist.'.format(output_path))
-            return(None)
-        if '7z' in zip_type.lower():
+        if not source_path or not os.path.isfile(source_path + file_name):
+            print(str(source_path) + file_name + ' does not exist.')
+            return(False)
+        if not output_path:
+            print('Output folder does not exist.')
+            return(False)
+        zip_type = zip_type.lower()
+        if not self._check_zip_type(zip_type, None):
+            return(False)
+        if zip_type == '7z':
             command = ['7z', 'x', source_path + file_name,
                        '-o{}'.format(output_path)]
             if password is not None:
                 command.append('-p{}'.format(password))
-            subprocess.call(command)
-            if remove_raw:
-                self.DeleteFile(source_path, file_name)
-        print(file_name + ' is unzipped.')
+            if not self._run_7z(command, file_name, verbose):
+                print('Failed unzipping ' + file_name)
+                return(False)
+        else:
+            try:
+                self._extract(source_path + file_name, output_path,
+                              zip_type, password)
+            except Exception as e:
+                print('Failed unzipping {}: {}'.format(file_name, e))
+                return(False)
+        if remove_raw:
+            self.DeleteFile(source_path, file_name, verbose = verbose)
+        if verbose:
+            print(file_name + ' is unzipped.')
+        return(True)
 
 
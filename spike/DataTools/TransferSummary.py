@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:58:16 2026
+
+@author: Jian Cao
+
+Count the files of a folder transfer run on a pool of threads
+"""
+
+## Set environment ------------------------------------------------------------
+import time
+import threading
+
+## Define class ---------------------------------------------------------------
+class TransferSummary:
+    """Object that counts the transferred, skipped and failed files
+    The counters are shared by the threads of a transfer.
+    Functions:
+        .Done(size)
+        .Skip()
+        .Fail(file_name, error)
+        .Finish()
+    """
+
+    def __init__(self, action):
+        """
+        Parameters:
+            action (str): 'upload' or 'download', used in the messages.
+        """
+        self.action = action
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+        self.result = {'files': 0, 'skipped': 0, 'failed': [], 'bytes': 0}
+
+
+    def Done(self, size):
+        with self.lock:
+            self.result['files'] += 1
+            self.result['bytes'] += size
+
+
+    def Skip(self):
+        with self.lock:
+            self.result['skipped'] += 1
+
+
+    def Fail(self, file_name, error):
+        print('Failed {}ing {}: {}'.format(self.action, file_name, error))
+        with self.lock:
+            self.result['failed'].append(file_name)
+
+
+    def Finish(self):
+        """Print the summary of the transfer
+        Returns:
+           dict: {files, skipped, failed, bytes, seconds, mb_per_sec},
+                 failed is the list of files that are not transferred.
+        """
+        result = self.result
+        result['seconds'] = time.perf_counter() - self.start_time
+        result['mb_per_sec'] = result['bytes'] / 1e6 / result['seconds']
+        print('{} files ({:.1f} MB) are {}ed in {:.1f} seconds, '
+              '{:.1f} MB/s. {} skipped, {} failed.'.format(
+              result['files'], result['bytes'] / 1e6, self.action,
+              result['seconds'], result['mb_per_sec'], result['skipped'],
+              len(result['failed'])))
+        return(result)
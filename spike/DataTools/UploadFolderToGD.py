@@ -7,26 +7,61 @@ Created on Sun Jan 24 09:38:58 2021
 Move files from local folder to Google Drive
 """
 
-from spike.DataTools import ConnectGoogleDrive
+## Set environment ------------------------------------------------------------
+import os
+from concurrent.futures import ThreadPoolExecutor
+from spike.DataTools import ConnectGoogleDrive, FileCMD
+from spike.DataTools.TransferSummary import TransferSummary
 
-def UploadFolderToGD(token_path, source_path, gd_folder):
+## Define function ------------------------------------------------------------
+def UploadFolderToGD(token_path, source_path, gd_folder, workers = 4):
     """Move files from local folder to Google Drive
+    Files already in the GD folder with the same size and md5 are skipped.
     Parameters: 
         token_path (str): path to the GD token.
         source_path (str): path to the source folder.
         gd_folder (str): name of the GD folder.
+        workers (int): number of concurrent uploads. Default 4.
     Returns:     
-       None
+       dict: {files, skipped, failed, bytes, seconds, mb_per_sec},
+             failed is the list of files that are not uploaded.
     """ 
+    summary = TransferSummary('upload')
     google_drive = ConnectGoogleDrive(token_path)
-    file_cmd = spike.FileCMD()
+    file_cmd = FileCMD()
+    source_path = google_drive._check_path(source_path)
     file_list = file_cmd.ListFiles(source_path)
     print('\nUpload List:')
     print('\n'.join(file_list))
     print('')
-    
+
     item_list = google_drive.ListItems(gd_folder, None)
+    if len(item_list) != 1:
+        print('Found {} GD folders, Please check the folder name.'.format(
+                  len(item_list)))
+        return(None)
     folder_id = item_list[0]['id']
-    
-    for file_name in file_list:
-        google_drive.UploadFile(source_path, folder_id, file_name)
\ No newline at end of file
+    uploaded = {x['name']: x for x in google_drive.ListItems(
+                    None, folder_id, fields = ['id', 'name', 'size',
+                                               'md5Checksum'])}
+
+    def upload(file_name):
+        size = os.path.getsize(source_path + file_name)
+        item = uploaded.get(file_name)
+        # skip files that are already uploaded
+        if (item and item.get('size') == str(size) and
+            item.get('md5Checksum') == google_drive._file_md5(
+                                           source_path + file_name)):
+            summary.Skip()
+            return
+        try:
+            google_drive.UploadFile(source_path, folder_id, file_name)
+        except Exception as e:
+            summary.Fail(file_name, e)
+            return
+        summary.Done(size)
+
+    # UploadFile sends its requests through a per-thread authorized Http
+    with ThreadPoolExecutor(max_workers = workers) as executor:
+        list(executor.map(upload, file_list))
+    return(summary.Finish())
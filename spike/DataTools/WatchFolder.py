@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:20:37 2026
+
+@author: Jian Cao
+
+Watch a folder for finished files (inotify on Linux, polling elsewhere)
+
+inotify reference:
+    https://man7.org/linux/man-pages/man7/inotify.7.html
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+
+## Define class ---------------------------------------------------------------
+class WatchFolder:
+    """Object that reports files finished in a folder
+    A file is finished when it is closed after writing (IN_CLOSE_WRITE)
+    or renamed into the folder (IN_MOVED_TO). Without inotify the folder
+    is polled and a file is finished once its size and mtime stop changing
+    between two polls.
+    Functions:
+        .Wait(timeout = None)
+        .Close()
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    EVENT = struct.Struct('iIII') # wd, mask, cookie, len
+
+    def __init__(self, folder_path, pattern = '', poll_seconds = 5,
+                 use_inotify = True):
+        """
+        Parameters:
+            folder_path (str): path of the watched folder.
+            pattern (str): only report file names containing it.
+            poll_seconds (int): interval of the polling fallback.
+            use_inotify (bool): set it to False to force polling.
+        """
+        if not os.path.isdir(folder_path):
+            raise ValueError('"' + folder_path + '" is not an valid path.')
+        self.folder_path = folder_path
+        self.pattern = pattern or ''
+        self.poll_seconds = poll_seconds
+        self.fd = None
+        if use_inotify:
+            self._start_inotify()
+        if self.fd is None:
+            self.snapshot = self._scan()
+            self.changed = {}
+            print('Watching ' + folder_path + ' by polling every ' +
+                  str(poll_seconds) + ' seconds.')
+        else:
+            print('Watching ' + folder_path + ' with inotify.')
+
+
+    def _start_inotify(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                               use_errno = True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError, TypeError):
+            return
+        if fd < 0:
+            return
+        wd = libc.inotify_add_watch(fd, os.fsencode(self.folder_path),
+                                    self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            return
+        self.fd = fd
+
+
+    def _match(self, file_name):
+        return(self.pattern in file_name and
+               not file_name.endswith('.partial'))
+
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.folder_path) as entries:
+            for entry in entries:
+                if entry.is_file() and self._match(entry.name):
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return(snapshot)
+
+
+    def _read_events(self, timeout):
+        # returns finished names, None when the kernel queue overflowed
+        ready = select.select([self.fd], [], [], timeout)[0]
+        if not ready:
+            return([])
+        data = os.read(self.fd, 65536)
+        file_list = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, cookie, size = self.EVENT.unpack_from(data, pos)
+            pos += self.EVENT.size
+            file_name = os.fsdecode(data[pos:pos + size].rstrip(b'\0'))
+            pos += size
+            if mask & self.IN_Q_OVERFLOW:
+                print('Watch events are lost, the folder needs a rescan.')
+                return(None)
+            if (file_name and self._match(file_name) and
+                file_name not in file_list):
+                file_list.append(file_name)
+        return(file_list)
+
+
+    def _poll(self):
+        snapshot = self._scan()
+        file_list = []
+        for file_name, stat in snapshot.items():
+            if self.snapshot.get(file_name) == stat:
+                if self.changed.pop(file_name, None) == stat:
+                    file_list.append(file_name)
+            else:
+                self.changed[file_name] = stat
+        self.changed = {x: y for x, y in self.changed.items()
+                        if x in snapshot}
+        self.snapshot = snapshot
+        return(file_list)
+
+
+    def Wait(self, timeout = None):
+        """Wait for finished files
+        Parameters:
+            timeout (int): max number of seconds to wait. None waits
+                           until a file is finished.
+        Returns:
+            list(str): names of the finished files, [] if the timeout
+                       expires. None if events were lost, rescan the
+                       folder then.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.time())
+            if self.fd is not None:
+                file_list = self._read_events(remaining)
+            else:
+                if remaining is None or remaining > self.poll_seconds:
+                    remaining = self.poll_seconds
+                time.sleep(remaining)
+                file_list = self._poll()
+            if file_list is None or file_list:
+                return(file_list)
+            if deadline is not None and time.time() >= deadline:
+                return([])
+
+
+    def Close(self):
+        """Stop watching the folder
+        Returns:
+            None
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
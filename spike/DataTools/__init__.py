@@ -3,4 +3,5 @@ from .ConnectGoogleDrive import ConnectGoogleDrive
 from .ConnectGoogleCloudStorage import ConnectGoogleCloudStorage
 from .FileCMD import FileCMD
 from .UploadFolderToGD import UploadFolderToGD
-from .DownloadFolderFromGD import DownloadFolderFromGD
\ No newline at end of file
+from .DownloadFolderFromGD import DownloadFolderFromGD
+from .WatchFolder import WatchFolder
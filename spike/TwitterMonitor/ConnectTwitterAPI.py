@@ -8,15 +8,24 @@ Collect Tweets from Twitter API (Stream, REST, Lab-COVID19)
 """
 
 ## Set environment ------------------------------------------------------------
-# import os
+import os
 import time
+import gzip
 import json
 import requests
 import uuid
+import pickle
+import threading
 import multiprocessing
 from datetime import datetime, timedelta
 from requests import HTTPError, ConnectionError
+from requests.exceptions import ChunkedEncodingError
 from TwitterAPI import TwitterAPI, TwitterConnectionError, TwitterRequestError
+from spike.TwitterMonitor.SharedMemoryRing import SharedMemoryRing
+try:
+    import zstandard
+except ImportError: # optional, needed by compression = 'zstd'
+    zstandard = None
 
 ## Define class ---------------------------------------------------------------
 class ConnectTwitterAPI:
@@ -108,6 +117,33 @@ class ConnectTwitterAPI:
             self.params = {'partition': self.input_dict['partition']}
             self.resource = 'labs/1/tweets/stream/covid19'
         
+        # raw mode forwards stream lines as bytes without decoding them
+        self.raw = bool(self.input_dict.get('raw', False))
+        if self.raw and self.api_type == 'rest_v1':
+            raise ValueError('RAW is only supported by stream APIs.')
+
+        # prepare transport
+        self.transport = 'pipe'
+        if 'transport' in self.input_dict:
+            self.transport = self.input_dict['transport'].lower()
+        if not any([x == self.transport for
+                x in ['pipe', 'batch', 'ring']]):
+            raise Exception('TRANSPORT ' + self.transport +
+                            ' is not currently supported')
+        if self.transport == 'ring' and not hasattr(self, 'ring'):
+            ring_mb = 64
+            if 'ring_mb' in self.input_dict:
+                ring_mb = float(self.input_dict['ring_mb'])
+            self.ring = SharedMemoryRing(ring_mb)
+        if self.transport in ['batch', 'ring']:
+            self.batch = []
+            self.batch_size = 500
+            self.batch_seconds = 1.0
+            if 'batch_size' in self.input_dict:
+                self.batch_size = int(self.input_dict['batch_size'])
+            if 'batch_seconds' in self.input_dict:
+                self.batch_seconds = float(self.input_dict['batch_seconds'])
+
         # prepare outlet
         if not hasattr(self, 'pipe_in') or not hasattr(self, 'pipe_out'):
             self.pipe_in, self.pipe_out = multiprocessing.Pipe()
@@ -115,6 +151,28 @@ class ConnectTwitterAPI:
             not hasattr(self, 'tweets')):
             self.tweets = []
             self.tweet_count = 0
+            self.file = None
+        self.file_format = 'txt'
+        if 'file_format' in self.input_dict:
+            self.file_format = self.input_dict['file_format'].lower()
+        if not any([x == self.file_format for
+                x in ['txt', 'ndjson']]):
+            raise Exception('FILE_FORMAT ' + self.file_format +
+                            ' is not currently supported')
+        self.compression = None
+        self.compression_level = None
+        if self.input_dict.get('compression'):
+            self.compression = self.input_dict['compression'].lower()
+        if 'compression_level' in self.input_dict:
+            self.compression_level = int(self.input_dict['compression_level'])
+        if not any([x == self.compression for
+                x in [None, 'gzip', 'zstd']]):
+            raise Exception('COMPRESSION ' + self.compression +
+                            ' is not currently supported')
+        if self.compression == 'zstd' and zstandard is None:
+            raise ImportError('COMPRESSION zstd needs the zstandard package.')
+        self.extension = {None: '', 'gzip': '.gz',
+                          'zstd': '.zst'}[self.compression]
         if self.outlet_type == 'local_count':
             self.tweets_per_file = 15000
             if 'tweets_per_file' in self.input_dict:
@@ -129,6 +187,69 @@ class ConnectTwitterAPI:
             raise ValueError('FILE_PREFIX, DOWNLOAD_PATH are needed.')
 
 
+    def _start_sender(self):
+        # runs in the collector process
+        if self.transport in ['batch', 'ring']:
+            self.batch_lock = threading.Lock()
+            threading.Thread(target = self._batch_timer,
+                             daemon = True).start()
+
+
+    def _send_tweet(self, tweet):
+        if self.transport == 'pipe':
+            self.pipe_in.send(tweet)
+            return
+        with self.batch_lock:
+            if not self.batch:
+                self.batch_deadline = time.time() + self.batch_seconds
+            self.batch.append(tweet)
+            if len(self.batch) >= self.batch_size:
+                self._flush_batch()
+
+
+    def _flush_batch(self):
+        # caller must hold self.batch_lock
+        if not self.batch:
+            return
+        if self.transport == 'ring':
+            self.ring.Put(pickle.dumps(self.batch,
+                                       pickle.HIGHEST_PROTOCOL))
+        else:
+            self.pipe_in.send(self.batch)
+        self.batch = []
+
+
+    def _batch_timer(self):
+        # flush partial batches so that no tweet waits longer than
+        # batch_seconds (plus one tick) during quiet periods
+        while True:
+            time.sleep(self.batch_seconds / 4)
+            with self.batch_lock:
+                if self.batch and time.time() >= self.batch_deadline:
+                    self._flush_batch()
+
+
+    def _send_finished(self):
+        if self.transport == 'pipe':
+            self.pipe_in.send("FINISHED")
+            return
+        with self.batch_lock:
+            self._flush_batch()
+            if self.transport == 'ring':
+                self.ring.Put(pickle.dumps("FINISHED"))
+            else:
+                self.pipe_in.send("FINISHED")
+
+
+    def _receive_tweets(self):
+        if self.transport == 'ring':
+            return(pickle.loads(self.ring.Get()))
+        message = self.pipe_out.recv()
+        if message == "FINISHED" or self.transport == 'batch':
+            return(message)
+        return([message])
+
+
     def _request_stream_v1(self):
         self.response = self.twitter_api.request(self.resource,
                                                  self.params)
@@ -140,20 +261,42 @@ class ConnectTwitterAPI:
             print(('Connected to Lab API COVID19 partition ' +
                    str(self.input_dict['partition'])))
         print('Collecting tweets...')
+        if self.raw:
+            return(self._forward_raw_lines())
         for tweet in self.response:
             if 'text' in tweet:
-                self.pipe_in.send(tweet)
+                self._send_tweet(tweet)
             elif 'disconnect' in tweet:
-                event = tweet['disconnect']
-                if event['code'] in [2,5,6,7]:
-                    raise Exception(event['reason']) # something needs to be fixed before re-connecting
-                else:
-                    print(('Disconnect Code: ' + event['code'] +
-                          '. Reason: ' + event['reason']))
-                    return(True) # temporary interruption, re-try request
+                return(self._handle_disconnect(tweet['disconnect']))
+        return(True) # stream stopped with no reason, re-try request
+
+
+    def _forward_raw_lines(self):
+        # forward the original bytes, only disconnect messages are decoded
+        # same status check as TwitterResponse.get_iterator
+        if self.response.status_code != 200:
+            raise TwitterRequestError(self.response.status_code,
+                                      msg = self.response.text)
+        try:
+            for line in self.response.response.iter_lines(chunk_size = 65536):
+                if b'"text"' in line:
+                    self._send_tweet(line)
+                elif line.startswith(b'{"disconnect"'):
+                    return(self._handle_disconnect(
+                        json.loads(line)['disconnect']))
+        except ChunkedEncodingError as cee:
+            raise TwitterConnectionError(cee)
         return(True) # stream stopped with no reason, re-try request
 
 
+    def _handle_disconnect(self, event):
+        if event['code'] in [2,5,6,7]:
+            raise Exception(event['reason']) # something needs to be fixed before re-connecting
+        print(('Disconnect Code: ' + str(event['code']) +
+              '. Reason: ' + event['reason']))
+        return(True) # temporary interruption, re-try request
+
+
     def _request_rest_v1(self):
         self.response = self.twitter_api.request(self.resource,
                                                  self.params)
@@ -162,10 +305,10 @@ class ConnectTwitterAPI:
         tweets = self.response.json()['statuses']
         n_tweets = len(tweets)
         for tweet in tweets:
-            self.pipe_in.send(tweet)
+            self._send_tweet(tweet)
         if n_tweets == 0:
             print('No more tweets found.')
-            self.pipe_in.send("FINISHED")
+            self._send_finished()
             return(False)
         self.tweet_downloaded += n_tweets
         print('Downloaded {} tweets.'.format(self.tweet_downloaded))
@@ -174,6 +317,7 @@ class ConnectTwitterAPI:
 
 
     def _collect_tweets(self):
+        self._start_sender()
         last_error = None
         go = True
         while go:
@@ -221,54 +365,159 @@ class ConnectTwitterAPI:
             time.sleep(wait)
 
             
+    def _name_file(self, last_tweet, extension):
+        if self.raw:
+            last_tweet = json.loads(last_tweet)
+        tweet_time = last_tweet['created_at']
+        time_format = '%a %b %d %H:%M:%S %z %Y'
+        if 'v2' in self.api_type:
+            tweet_time = tweet_time[:-5]
+            time_format = '%Y-%m-%dT%H:%M:%S'
+        file_time = datetime.strptime(tweet_time,
+                                      time_format)
+        file_name = (self.input_dict['file_prefix'] + 
+                    file_time.strftime("-%Y-%m-%d-%H-%M-%S-") +
+                    str(uuid.uuid4()) + 
+                    extension)
+        return(file_name, file_time)
+
+
+    def _open_output(self, path):
+        # returns (disk file, writer), the writer compresses on the fly
+        disk_file = open(path, 'wb')
+        if self.compression == 'gzip':
+            level = self.compression_level
+            if level is None:
+                level = 6
+            writer = gzip.GzipFile(fileobj = disk_file, mode = 'wb',
+                                   compresslevel = level)
+        elif self.compression == 'zstd':
+            level = self.compression_level
+            if level is None:
+                level = 3
+            writer = zstandard.ZstdCompressor(level = level).stream_writer(
+                                              disk_file, closefd = False)
+        else:
+            writer = disk_file
+        return(disk_file, writer)
+
+
+    def _close_output(self, disk_file, writer):
+        if writer is not disk_file:
+            writer.close()
+        disk_file.flush()
+        os.fsync(disk_file.fileno())
+        disk_file.close()
+
+
+    def _report_file(self, file_name, file_time, n_tweets):
+        # confirmation message
+        if 'count' in self.outlet_type:
+            print(file_name + ' is saved.')
+        else:
+            print('{} ----- {} tweets'.format(str(file_time),
+                  str(n_tweets)))
+        # check transport backlog
+        if self.transport == 'ring':
+            print('Ring buffer high-water mark: {:.1f} of {:.1f} MB.'
+                  .format(self.ring.HighWaterMark() / 1048576,
+                          self.ring.capacity / 1048576))
+
+
+    def _save_file(self, tweets):
+        file_name, file_time = self._name_file(tweets[-1],
+                                               '.txt' + self.extension)
+        disk_file, file = self._open_output(self.input_dict['download_path'] +
+                                            file_name)
+        if self.raw:
+            # same JSON array layout, tweets are written verbatim
+            file.write(b'[' + b','.join(tweets) + b']')
+        else:
+            file.write(json.dumps(tweets).encode('utf-8'))
+        self._close_output(disk_file, file)
+        self._report_file(file_name, file_time, len(tweets))
+        # check stall warnings
+        if (not self.raw and 'warning' in tweets[0] and
+            'percent_full' in tweets[-1]['warning']):
+            if tweets[-1]['warning']['percent_full'] > 0: # change threshold when debugging is done.
+                print('Warning: the queue is ' + 
+                      str(tweets[-1]['warning']['percent_full']) + '% full.')
+
+
+    def _append_tweets(self, tweets):
+        # append one line per tweet to the open .partial file
+        if not tweets:
+            return
+        if self.file is None:
+            self.partial_name = (self.input_dict['file_prefix'] + '-' +
+                                 str(uuid.uuid4()) + '.ndjson' +
+                                 self.extension + '.partial')
+            self.disk_file, self.file = self._open_output(
+                    self.input_dict['download_path'] + self.partial_name)
+        if self.raw:
+            self.file.write(b'\n'.join(tweets) + b'\n')
+        else:
+            self.file.write(''.join([json.dumps(x) + '\n' for
+                                     x in tweets]).encode('utf-8'))
+        self.last_tweet = tweets[-1]
+        self.tweet_count += len(tweets)
+
+
+    def _rotate_file(self):
+        # close the .partial file and rename it atomically
+        if self.file is None:
+            return
+        file_name, file_time = self._name_file(self.last_tweet,
+                                               '.ndjson' + self.extension)
+        self._close_output(self.disk_file, self.file)
+        self.file = None
+        os.rename(self.input_dict['download_path'] + self.partial_name,
+                  self.input_dict['download_path'] + file_name)
+        self._report_file(file_name, file_time, self.tweet_count)
+        self.tweet_count = 0
+
+
+    def _stream_tweets(self, tweets):
+        if 'count' in self.outlet_type:
+            while tweets:
+                room = self.tweets_per_file - self.tweet_count
+                self._append_tweets(tweets[:room])
+                tweets = tweets[room:]
+                if self.tweet_count >= self.tweets_per_file:
+                    self._rotate_file()
+            return
+        self._append_tweets(tweets)
+        if datetime.now() >= self.file_timer:
+            self.file_timer = datetime.now() + self.minutes_per_file
+            self._rotate_file()
+
+
     def _save_locally(self):
         if self.outlet_type == 'local' and not hasattr(self, 'file_timer'):
             self.file_timer = datetime.now() + self.minutes_per_file
-        print('Start saving tweets into local TXT files...')
+        print('Start saving tweets into local {} files...'.format(
+              self.file_format.upper()))
         while True:
-            tweet = self.pipe_out.recv()
-            if tweet == "FINISHED":
+            tweets = self._receive_tweets()
+            if tweets == "FINISHED":
+                self._rotate_file()
                 return(False)
-            self.tweets.append(tweet)
-            self.tweet_count += 1
-            # determine if the file is ready
-            file_is_ready = False
-            if 'count' in self.outlet_type:
-                file_is_ready = self.tweet_count >= self.tweets_per_file
-            else:
-                file_is_ready = datetime.now() >= self.file_timer
-            # file is not ready, continue adding tweets
-            if not file_is_ready:
+            if self.file_format == 'ndjson':
+                self._stream_tweets(tweets)
                 continue
-            # save file
-            if self.outlet_type == 'local':
-                self.file_timer = datetime.now() + self.minutes_per_file
-            tweet_time = self.tweets[-1]['created_at']
-            time_format = '%a %b %d %H:%M:%S %z %Y'
-            if 'v2' in self.api_type:
-                tweet_time = tweet_time[:-5]
-                time_format = '%Y-%m-%dT%H:%M:%S'
-            file_time = datetime.strptime(tweet_time,
-                                          time_format)
-            file_name = (self.input_dict['file_prefix'] + 
-                        file_time.strftime("-%Y-%m-%d-%H-%M-%S-") +
-                        str(uuid.uuid4()) + 
-                        '.txt')
-            with open(self.input_dict['download_path'] +
-                      file_name, 'w') as file:
-                file.write(json.dumps(self.tweets))
-            # confirmation message
+            self.tweets += tweets
+            self.tweet_count += len(tweets)
+            # save files, a batch may overflow into the next file
             if 'count' in self.outlet_type:
-                print(file_name + ' is saved.')
-            else:
-                print('{} ----- {} tweets'.format(str(file_time),
-                      str(len(self.tweets))))
-            # check stall warnings
-            if ('warning' in self.tweets[0] and
-                'percent_full' in tweet['warning']):
-                if tweet['warning']['percent_full'] > 0: # change threshold when debugging is done.
-                    print('Warning: the queue is ' + 
-                          str(tweet['warning']['percent_full']) + '% full.')
+                while self.tweet_count >= self.tweets_per_file:
+                    self._save_file(self.tweets[:self.tweets_per_file])
+                    self.tweets = self.tweets[self.tweets_per_file:]
+                    self.tweet_count = len(self.tweets)
+                continue
+            if datetime.now() < self.file_timer:
+                continue
+            self.file_timer = datetime.now() + self.minutes_per_file
+            self._save_file(self.tweets)
             # clean self.tweets
             self.tweets = []
             self.tweet_count = 0
@@ -333,6 +582,9 @@ class ConnectTwitterAPI:
         self.tweets_out.join()
         self.pipe_in.close()
         self.pipe_out.close()
+        if self.transport == 'ring':
+            self.ring.Close(unlink = True)
+            del self.ring
         
         
 
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:41 2026
+
+@author: Jian Cao
+
+Fixed-capacity byte ring in shared memory (one writer, one reader)
+
+multiprocessing.shared_memory reference:
+    https://docs.python.org/3/library/multiprocessing.shared_memory.html
+"""
+
+## Set environment ------------------------------------------------------------
+import time
+import struct
+import multiprocessing
+from multiprocessing import shared_memory
+
+## Define class ---------------------------------------------------------------
+class SharedMemoryRing:
+    """Byte ring that links one writer process with one reader process
+    Records are stored as [4-byte length][payload]. The writer owns the
+    head and high-water-mark counters, the reader owns the tail counter.
+    Functions:
+        .Put(record)
+        .Get()
+        .HighWaterMark()
+        .Close(unlink = False)
+    """
+
+    HEADER = struct.Struct('QQQ') # head, tail, high-water mark
+    COUNTER = struct.Struct('Q')
+    LENGTH = struct.Struct('I')
+
+    def __init__(self, capacity_mb = 64):
+        if not capacity_mb or capacity_mb <= 0:
+            raise ValueError('CAPACITY_MB should be a positive number.')
+        self.capacity = int(capacity_mb * 1024 * 1024)
+        self.shm = shared_memory.SharedMemory(
+                        create = True,
+                        size = self.HEADER.size + self.capacity)
+        self._attach()
+        self.HEADER.pack_into(self.buf, 0, 0, 0, 0)
+        self.records = multiprocessing.Semaphore(0)
+        self.full_warned = False
+
+
+    def _attach(self):
+        self.buf = self.shm.buf
+        self.data = self.buf[self.HEADER.size:]
+
+
+    def __getstate__(self):
+        # memoryviews can not be pickled, a spawned process re-attaches
+        # to the shared memory by name
+        return({'name': self.shm.name, 'capacity': self.capacity,
+                'records': self.records, 'full_warned': self.full_warned})
+
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self.records = state['records']
+        self.full_warned = state['full_warned']
+        self.shm = shared_memory.SharedMemory(name = state['name'])
+        self._attach()
+
+
+    def _read_counter(self, index):
+        return(self.COUNTER.unpack_from(self.buf,
+                                        index * self.COUNTER.size)[0])
+
+
+    def _write_counter(self, index, value):
+        self.COUNTER.pack_into(self.buf, index * self.COUNTER.size, value)
+
+
+    def _write(self, pos, data):
+        pos = pos % self.capacity
+        first = min(len(data), self.capacity - pos)
+        self.data[pos:pos + first] = data[:first]
+        if first < len(data):
+            self.data[:len(data) - first] = data[first:]
+
+
+    def _read(self, pos, size):
+        pos = pos % self.capacity
+        first = min(size, self.capacity - pos)
+        if first == size:
+            return(bytes(self.data[pos:pos + size]))
+        return(bytes(self.data[pos:pos + first]) +
+               bytes(self.data[:size - first]))
+
+
+    def Put(self, record):
+        """Append a record, waiting while the ring is full
+        Parameters:
+           record (bytes): payload of the record.
+        Returns:
+           None
+        """
+        size = self.LENGTH.size + len(record)
+        if size > self.capacity:
+            raise ValueError('Record of {} bytes does not fit in the ring.'
+                             .format(len(record)))
+        head = self._read_counter(0)
+        while self.capacity - (head - self._read_counter(1)) < size:
+            if not self.full_warned:
+                print('Ring buffer is full, waiting for the outlet...')
+                self.full_warned = True
+            time.sleep(0.01)
+        if head - self._read_counter(1) < self.capacity // 2:
+            self.full_warned = False
+        self._write(head, self.LENGTH.pack(len(record)))
+        self._write(head + self.LENGTH.size, memoryview(record))
+        used = head + size - self._read_counter(1)
+        if used > self._read_counter(2):
+            self._write_counter(2, used)
+        self._write_counter(0, head + size)
+        self.records.release()
+
+
+    def Get(self):
+        """Remove the oldest record, waiting while the ring is empty
+        Returns:
+           bytes: payload of the record.
+        """
+        self.records.acquire()
+        tail = self._read_counter(1)
+        size = self.LENGTH.unpack(self._read(tail, self.LENGTH.size))[0]
+        record = self._read(tail + self.LENGTH.size, size)
+        self._write_counter(1, tail + self.LENGTH.size + size)
+        return(record)
+
+
+    def HighWaterMark(self):
+        """Peak number of bytes held in the ring
+        Returns:
+           int: bytes.
+        """
+        return(self._read_counter(2))
+
+
+    def Close(self, unlink = False):
+        """Detach from the shared memory
+        Parameters:
+           unlink (bool): also free the shared memory block (owner only).
+        Returns:
+           None
+        """
+        self.data.release()
+        self.buf = None
+        self.data = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
@@ -8,10 +8,218 @@ Sync Folder to Google Cloud Storage
 """
 
 # Setup
-from spike.DataTools import ConnectGoogleCloudStorage, FileCMD
-import pandas as pd
+from spike.DataTools import ConnectGoogleCloudStorage, FileCMD, WatchFolder
+from spike.TwitterMonitor.SyncState import SyncState
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import queue
 import time
+import os
+
+def _upload_file(storage, storage_bucket, upload_path,
+                 file_name, bucket_folder, upload_options = None):
+    # returns the hash of the uploaded object, None if failed
+    try:
+        file_hash = storage.UploadFile(storage_bucket,
+                                       upload_path,
+                                       file_name,
+                                       bucket_folder,
+                                       **(upload_options or {}))
+        return(file_hash or '')
+    except Exception as e:
+        print('Failed uploading {}: {}'.format(file_name, e))
+        return(None)
+
+
+def _upload_files(storage, storage_bucket, upload_path,
+                  file_list, bucket_folder, workers = 1,
+                  upload_options = None):
+    # files are submitted in time order, returns {file_name: hash}
+    if workers <= 1:
+        return({x: _upload_file(storage, storage_bucket, upload_path,
+                                x, bucket_folder, upload_options)
+                for x in file_list})
+    with ThreadPoolExecutor(max_workers = workers) as executor:
+        futures = {x: executor.submit(_upload_file, storage, storage_bucket,
+                                      upload_path, x, bucket_folder,
+                                      upload_options)
+                   for x in file_list}
+    return({x: futures[x].result() for x in file_list})
+
+
+def _check_time_pos(time_pos, file_name):
+    if not (len(time_pos) == 2 and
+            time_pos[0] < time_pos[1] and
+            time_pos[1] < len(file_name.rsplit('.', 1)[0])):
+        raise ValueError('TIME_POS should be the location ' + 
+              '[start, end] of the time substring.')
+
+
+def _parse_time(file_name, time_pos, time_format):
+    return(datetime.strptime(file_name[time_pos[0]:time_pos[1]],
+                             time_format))
+
+
+def _sort_files(file_list, time_pos, time_format):
+    # returns the file names sorted by time
+    if len(file_list) == 0:
+        return([])
+    _check_time_pos(time_pos, file_list[0])
+    return(sorted(file_list, key = lambda x: (_parse_time(x, time_pos,
+                                                          time_format), x)))
+
+
+def _index_files(state, folder_path, file_list, time_pos,
+                 time_format, marker = None):
+    # parse and stat only the files that are new to the index, files up
+    # to the marker were uploaded before
+    new_list = state.NewFiles(file_list)
+    if len(new_list) == 0:
+        return
+    _check_time_pos(time_pos, new_list[0])
+    marker_time = None
+    if marker:
+        marker_time = _parse_time(marker, time_pos, time_format)
+    file_rows = []
+    for file_name in new_list:
+        try:
+            size = os.path.getsize(os.path.join(folder_path, file_name))
+        except OSError: # removed or never created
+            continue
+        file_time = _parse_time(file_name, time_pos, time_format)
+        file_rows.append((file_name, file_time, size,
+                          marker_time is not None and
+                          file_time <= marker_time))
+    state.AddFiles(file_rows)
+
+
+def _record_uploads(state, file_list, upload_results):
+    # returns True if any file failed
+    file_hashes = {x: upload_results[x] for x in file_list
+                   if upload_results.get(x) is not None}
+    state.MarkUploaded(file_hashes)
+    return(len(file_hashes) < len(file_list))
+
+
+def _raw_files(state, file_cmd, source_path, pattern, zip_type, zip_set):
+    # raw files that are not zipped yet, skips those zipped already (kept
+    # when remove_raw is False): uploaded before, or waiting in zip_set.
+    # Returns {raw_name: zip_name}
+    raw_list = [x for x in file_cmd.ListFiles(source_path, pattern) or []
+                if not x.endswith('.partial')]
+    zip_names = {x: file_cmd.ZipName(x, zip_type) for x in raw_list}
+    zipped = set(state.UploadedFiles(list(zip_names.values())))
+    zipped.update(zip_set)
+    return({x: zip_names[x] for x in raw_list if zip_names[x] not in zipped})
+
+
+def _pipeline_files(file_cmd, storage, storage_bucket, source_path,
+                    zip_path, raw_list, pending_list, bucket_folder,
+                    remove_raw = True, password = None, zip_type = '7z',
+                    zip_workers = None, upload_workers = 1,
+                    upload_options = None):
+    # zip and upload at the same time, each zip file enters a bounded
+    # upload queue as soon as it is ready. Returns {zip_name: hash}
+    upload_workers = max(1, upload_workers)
+    upload_queue = queue.Queue(maxsize = 2 * upload_workers)
+    results = {}
+
+    def zip_stage(file_name):
+        zip_name = file_cmd.ZipName(file_name, zip_type)
+        try:
+            zipped = file_cmd.ZipFile(source_path,
+                                      zip_path,
+                                      file_name,
+                                      remove_raw = remove_raw,
+                                      password = password,
+                                      zip_type = zip_type,
+                                      verbose = False)
+        except Exception as e:
+            print('Failed zipping {}: {}'.format(file_name, e))
+            zipped = False
+        if zipped:
+            upload_queue.put(zip_name) # waits while uploads fall behind
+        else:
+            print('Failed zipping ' + file_name)
+            results[zip_name] = None
+
+    def upload_stage():
+        while True:
+            zip_name = upload_queue.get()
+            if zip_name is None:
+                return
+            results[zip_name] = _upload_file(storage, storage_bucket,
+                                             zip_path, zip_name,
+                                             bucket_folder, upload_options)
+
+    uploaders = [threading.Thread(target = upload_stage)
+                 for _ in range(upload_workers)]
+    for uploader in uploaders:
+        uploader.start()
+    with ThreadPoolExecutor(max_workers = (zip_workers or
+                                           os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(zip_stage, x) for x in raw_list]
+        # zip files left over from earlier passes
+        for zip_name in pending_list:
+            upload_queue.put(zip_name)
+        for future in futures:
+            future.result()
+    for uploader in uploaders:
+        upload_queue.put(None)
+    for uploader in uploaders:
+        uploader.join()
+    return(results)
+
+
+def _watch_files(watcher, state, file_cmd, storage, storage_bucket,
+                 source_path, zip_path, bucket_folder, time_pos,
+                 time_format, wait_next, remove_raw = True, password = None,
+                 zip_files = True, zip_type = '7z', zip_workers = None,
+                 upload_workers = 1, upload_options = None):
+    # upload files as soon as they are finished until wait_next seconds
+    # pass, returns True if any file failed
+    deadline = time.time() + wait_next
+    while time.time() < deadline:
+        file_list = watcher.Wait(timeout = deadline - time.time())
+        if file_list is None:
+            return(False) # the next full pass catches up
+        # skip files that the last full pass already handled
+        file_list = [x for x in state.NewFiles(file_list)
+                     if os.path.exists(os.path.join(source_path, x))]
+        file_list = _sort_files(file_list, time_pos, time_format)
+        if len(file_list) == 0:
+            continue
+        if zip_files:
+            upload_results = _pipeline_files(file_cmd,
+                                             storage,
+                                             storage_bucket,
+                                             source_path,
+                                             zip_path,
+                                             file_list,
+                                             [],
+                                             bucket_folder,
+                                             remove_raw = remove_raw,
+                                             password = password,
+                                             zip_type = zip_type,
+                                             zip_workers = zip_workers,
+                                             upload_workers = upload_workers,
+                                             upload_options = upload_options)
+            file_list = [file_cmd.ZipName(x, zip_type) for x in file_list]
+            _index_files(state, zip_path, file_list, time_pos, time_format)
+        else:
+            _index_files(state, source_path, file_list, time_pos, time_format)
+            upload_results = _upload_files(storage,
+                                           storage_bucket,
+                                           source_path,
+                                           file_list,
+                                           bucket_folder,
+                                           workers = upload_workers,
+                                           upload_options = upload_options)
+        if _record_uploads(state, file_list, upload_results):
+            return(True)
+    return(False)
+
 
 def SyncFolderToCloudStorage(source_path,
                             zip_path,
@@ -26,7 +234,17 @@ def SyncFolderToCloudStorage(source_path,
                             time_format = '%Y-%m-%d-%H-%M-%S',
                             delete_after_days = 7,
                             wait_retry = 5,
-                            wait_next = 900):
+                            wait_next = 900,
+                            zip_files = True,
+                            zip_workers = None,
+                            zip_type = '7z',
+                            upload_workers = 1,
+                            pipeline = False,
+                            watch = False,
+                            state_path = None,
+                            upload_chunk_mb = None,
+                            composite_mb = None,
+                            composite_parts = 8):
     """Sync a folder to Google Cloud Storage
     Parameters: 
         source_path (str): path to the source folder.
@@ -39,77 +257,160 @@ def SyncFolderToCloudStorage(source_path,
         bucket_folder (str): path of the bucket folder. Can be None.
         pattern (str): pattern used in filtering the files being zipped.
         marker (str): name of the last successful uploaded zip file.
+                      Files up to it are recorded as uploaded when they
+                      are first indexed.
         time_format (str): used in converting time substring to datetime.
-        delete_after_days (int): number of days before a zip file is deleted.
+        delete_after_days (int): number of days before an uploaded zip
+                                 file is deleted.
         wait_retry (int): number of seconds before next retry.
         wait_next (int): number of seconds before next update.
+        zip_files (bool): zip the files with 7z before uploading. Set it to
+                          False for files the monitor already compressed
+                          (e.g. '.gz', '.zst'), they are uploaded as they
+                          are from source_path. zip_path can be None then.
+        zip_workers (int): number of files zipped concurrently.
+                           Default None, the number of CPUs.
+        zip_type (str): archive format, see FileCMD.ZipFile. Default 7z.
+        upload_workers (int): number of files uploaded concurrently.
+                              Default 1.
+        pipeline (bool): upload each zip file as soon as it is zipped
+                         instead of zipping the whole folder first.
+        watch (bool): upload files as soon as they are closed or moved
+                      into source_path (inotify, polling elsewhere).
+                      A full pass still runs every wait_next seconds.
+        state_path (str): path of the SQLite file that records the time,
+                          size, hash, upload and deletion status of each
+                          file, the sync resumes from it after a restart.
+                          Default None, the state is kept in memory.
+        upload_chunk_mb (int): upload in resumable, checksum verified
+                               chunks of this size, see
+                               ConnectGoogleCloudStorage.UploadFile.
+                               Default None, one request per file.
+        composite_mb (int): upload files of at least this size as
+                            composite_parts concurrent parts that are
+                            composed into one object. Default None.
+        composite_parts (int): number of parts. Default 8.
     Returns:     
        None
     """ 
-    if (not source_path or not zip_path or not token_path or
+    if (not source_path or not token_path or
         not storage_bucket or not time_pos):
-        raise ValueError('SOURCE_PATH, TOKEN_PATH, ZIP_PATH, ' +
+        raise ValueError('SOURCE_PATH, TOKEN_PATH, ' +
               'STORAGE_BUCKET, and TIME_POS are needed')
+    if zip_files and not zip_path:
+        raise ValueError('ZIP_PATH is needed when ZIP_FILES is True')
+    
+    upload_options = {'chunk_mb': upload_chunk_mb,
+                      'composite_mb': composite_mb,
+                      'composite_parts': composite_parts}
+    state = SyncState(state_path)
+    watcher = None
+    if watch:
+        # start watching before the first pass so no file is missed
+        watcher = WatchFolder(source_path, pattern = pattern)
+    
+    # connect Cloud Storage once, the connections are reused by every pass,
+    # one per concurrent upload (or composite part)
+    pool_size = max(upload_workers, 1) * (composite_parts if composite_mb
+                                          else 1)
+    storage = ConnectGoogleCloudStorage(
+                  token_path,
+                  pool_size = max(pool_size,
+                                  ConnectGoogleCloudStorage.POOL_SIZE))
+    
+    # prepare File CMD module
+    file_cmd = FileCMD()
     
     while True:
         retry = False
-        # connect Cloud Storage
-        storage = ConnectGoogleCloudStorage(token_path)
-        
-        # prepare File CMD module
-        file_cmd = FileCMD()
-        
-        # zip files
-        file_cmd.ZipFolder(source_path,
-                           zip_path,
-                           pattern = pattern,
-                           remove_raw = remove_raw,
-                           password = password)
+        if zip_files and not pipeline:
+            # zip the new files only, zip files deleted after upload
+            # are not rebuilt from the kept raw files
+            extension = FileCMD.ZIP_EXTENSIONS[zip_type.lower()]
+            zip_names = _raw_files(state, file_cmd, source_path, pattern,
+                                   zip_type,
+                                   file_cmd.ListFiles(zip_path, extension)
+                                   or [])
+            zip_results = file_cmd.ZipFolder(source_path,
+                                             zip_path,
+                                             remove_raw = remove_raw,
+                                             password = password,
+                                             zip_type = zip_type,
+                                             workers = zip_workers,
+                                             file_list = list(zip_names))
+            for file_name, zipped in (zip_results or {}).items():
+                if not zipped:
+                    print('Failed zipping ' + file_name)
+                    retry = True
         
         # list files
-        file_list = file_cmd.ListFiles(zip_path, '.7z')
-        
-        # sort time
-        if not (len(time_pos) == 2 and
-                time_pos[0] < time_pos[1] and
-                time_pos[1] < len(file_list[0].rsplit('.', 1)[0])):
-            raise ValueError('TIME_POS should be the location ' + 
-                  '[start, end] of the time substring.')
-            
-        file_time = [datetime.strptime(x[time_pos[0]:time_pos[1]],
-                                       time_format) for x in file_list]
-        file_df = pd.DataFrame({'file_name': file_list, 'time': file_time})
-        file_df = file_df.sort_values(by = 'time',
-                                      ascending = True).reset_index()
-        
-        # specify files will be uploaded/deleted
-        file_upload_list = file_df['file_name'].tolist()
-        if marker:
-            upload_cutoff = datetime.strptime(marker[time_pos[0]:time_pos[1]],
-                                       time_format)
-            file_upload_list = file_df[file_df['time'] >
-                                       upload_cutoff]['file_name'].tolist()
+        if zip_files:
+            upload_path = zip_path
+            extension = FileCMD.ZIP_EXTENSIONS[zip_type.lower()]
+            file_list = [x for x in file_cmd.ListFiles(zip_path, extension)
+                         if x.endswith(extension)]
+        else:
+            # list compressed files, skip those still being written
+            upload_path = source_path
+            file_list = [x for x in file_cmd.ListFiles(source_path, pattern)
+                         if not x.endswith('.partial')]
         
-        delete_cutoff = datetime.now() - timedelta(days = delete_after_days)
-        file_delete_list = file_df[file_df['time'] <
-                                   delete_cutoff]['file_name'].tolist()
+        # index new files, forget pending files that are gone
+        _index_files(state, upload_path, file_list,
+                     time_pos, time_format, marker)
+        file_set = set(file_list)
+        file_upload_list = state.PendingFiles()
+        state.MarkDeleted([x for x in file_upload_list if x not in file_set])
+        file_upload_list = [x for x in file_upload_list if x in file_set]
         
         # upload files
-        for file_name in file_upload_list:
-            try:
-                storage.UploadFile(storage_bucket,
-                                   zip_path,
-                                   file_name,
-                                   bucket_folder)
-                marker = file_name
-            except:
-                print('Failed uploading ' + file_name)
-                retry = True
-                continue
+        if zip_files and pipeline:
+            # zip files waiting in zip_path are uploaded with the pending
+            # files
+            zip_names = _raw_files(state, file_cmd, source_path, pattern,
+                                   zip_type, file_set)
+            raw_list = _sort_files(list(zip_names), time_pos, time_format)
+            if marker and raw_list:
+                # files up to the marker were uploaded before
+                marker_time = _parse_time(marker, time_pos, time_format)
+                raw_list = [x for x in raw_list if
+                            _parse_time(x, time_pos, time_format) >
+                            marker_time]
+            zip_list = [zip_names[x] for x in raw_list]
+            upload_results = _pipeline_files(file_cmd,
+                                             storage,
+                                             storage_bucket,
+                                             source_path,
+                                             zip_path,
+                                             raw_list,
+                                             file_upload_list,
+                                             bucket_folder,
+                                             remove_raw = remove_raw,
+                                             password = password,
+                                             zip_type = zip_type,
+                                             zip_workers = zip_workers,
+                                             upload_workers = upload_workers,
+                                             upload_options = upload_options)
+            _index_files(state, zip_path, zip_list,
+                         time_pos, time_format, marker)
+            file_upload_list = file_upload_list + zip_list
+        else:
+            upload_results = _upload_files(storage,
+                                           storage_bucket,
+                                           upload_path,
+                                           file_upload_list,
+                                           bucket_folder,
+                                           workers = upload_workers,
+                                           upload_options = upload_options)
+        if _record_uploads(state, file_upload_list, upload_results):
+            retry = True
         
-        # delete old files
+        # delete old files that are uploaded
+        delete_cutoff = datetime.now() - timedelta(days = delete_after_days)
+        file_delete_list = state.ExpiredFiles(delete_cutoff)
         for file_name in file_delete_list:
-            file_cmd.DeleteFile(zip_path, file_name, verbose = False)
+            file_cmd.DeleteFile(upload_path, file_name, verbose = False)
+        state.MarkDeleted(file_delete_list)
         
         # finish
         if retry:
@@ -120,5 +421,32 @@ def SyncFolderToCloudStorage(source_path,
                   '} have been synchronized to ' +
                   'Cloud Storage bucket {' + storage_bucket +
                   '}, folder {' + bucket_folder + '}.')
-            print('Waiting for next update...')
-            time.sleep(wait_next)
\ No newline at end of file
+            stats = storage.ConnectionStats()
+            print('{} connections opened for {} requests ({:.0%} reused).'
+                  .format(stats['connections'], stats['requests'],
+                          stats['reuse']))
+            if watcher is None:
+                print('Waiting for next update...')
+                time.sleep(wait_next)
+            else:
+                print('Watching for new files...')
+                if _watch_files(watcher,
+                                state,
+                                file_cmd,
+                                storage,
+                                storage_bucket,
+                                source_path,
+                                zip_path,
+                                bucket_folder,
+                                time_pos,
+                                time_format,
+                                wait_next,
+                                remove_raw = remove_raw,
+                                password = password,
+                                zip_files = zip_files,
+                                zip_type = zip_type,
+                                zip_workers = zip_workers,
+                                upload_workers = upload_workers,
+                                upload_options = upload_options):
+                    print('Re-trying...')
+                    time.sleep(wait_retry)
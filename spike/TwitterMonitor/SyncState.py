@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:05:12 2026
+
+@author: Jian Cao
+
+SQLite index of the files handled by SyncFolderToCloudStorage
+
+sqlite3 reference:
+    https://docs.python.org/3/library/sqlite3.html
+"""
+
+## Set environment ------------------------------------------------------------
+import sqlite3
+
+## Define class ---------------------------------------------------------------
+class SyncState:
+    """Index of the files handled by SyncFolderToCloudStorage
+    Each file is recorded once with its parsed time, size, hash, upload
+    status and deletion status, so a pass only parses new files and a
+    restarted sync resumes where it stopped.
+    Functions:
+        .NewFiles(file_list)
+        .AddFiles(file_rows)
+        .PendingFiles()
+        .UploadedFiles(file_list)
+        .ExpiredFiles(cutoff)
+        .MarkUploaded(file_hashes)
+        .MarkDeleted(file_list)
+        .Close()
+    """
+
+    def __init__(self, state_path = None):
+        """
+        Parameters:
+            state_path (str): path of the SQLite file. Default None, the
+                              index is kept in memory and lost on exit.
+        """
+        self.conn = sqlite3.connect(state_path or ':memory:')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS files ('
+                          'file_name TEXT PRIMARY KEY, '
+                          'time TEXT NOT NULL, '
+                          'size INTEGER, '
+                          'hash TEXT, '
+                          'uploaded INTEGER NOT NULL DEFAULT 0, '
+                          'deleted INTEGER NOT NULL DEFAULT 0)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS pending ON files(time) '
+                          'WHERE uploaded = 0 AND deleted = 0')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS expiring ON '
+                          'files(time) WHERE uploaded = 1 AND deleted = 0')
+        self.conn.commit()
+        self.known = set([x[0] for x in
+                          self.conn.execute('SELECT file_name FROM files')])
+        if state_path:
+            print('Sync state {' + state_path + '} has ' +
+                  str(len(self.known)) + ' files.')
+
+
+    def NewFiles(self, file_list):
+        """Files that are not in the index yet
+        Parameters:
+            file_list (list(str)): file names.
+        Returns:
+            list(str): file names, same order as file_list.
+        """
+        return([x for x in file_list if x not in self.known])
+
+
+    def AddFiles(self, file_rows):
+        """Add files to the index, known files are ignored
+        Parameters:
+            file_rows (list(tuple)): (file_name, time (datetime),
+                                      size (int), uploaded (bool)).
+        Returns:
+            None
+        """
+        self.conn.executemany('INSERT OR IGNORE INTO files '
+                              '(file_name, time, size, uploaded) '
+                              'VALUES (?, ?, ?, ?)',
+                              [(x[0], x[1].isoformat(' '), x[2], int(x[3]))
+                               for x in file_rows])
+        self.conn.commit()
+        self.known.update([x[0] for x in file_rows])
+
+
+    def PendingFiles(self):
+        """Files that are neither uploaded nor deleted
+        Returns:
+            list(str): file names in time order.
+        """
+        return([x[0] for x in self.conn.execute(
+                    'SELECT file_name FROM files WHERE uploaded = 0 '
+                    'AND deleted = 0 ORDER BY time, file_name')])
+
+
+    def UploadedFiles(self, file_list):
+        """Files of file_list that are recorded as uploaded
+        Parameters:
+            file_list (list(str)): file names.
+        Returns:
+            list(str): file names, same order as file_list.
+        """
+        known_list = [x for x in file_list if x in self.known]
+        uploaded = set()
+        for i in range(0, len(known_list), 500): # SQLite variable limit
+            chunk = known_list[i:i + 500]
+            uploaded.update([x[0] for x in self.conn.execute(
+                'SELECT file_name FROM files WHERE uploaded = 1 AND '
+                'file_name IN ({})'.format(','.join('?' * len(chunk))),
+                chunk)])
+        return([x for x in file_list if x in uploaded])
+
+
+    def ExpiredFiles(self, cutoff):
+        """Uploaded files older than cutoff that are not deleted yet
+        Parameters:
+            cutoff (datetime): files before it are expired.
+        Returns:
+            list(str): file names in time order.
+        """
+        return([x[0] for x in self.conn.execute(
+                    'SELECT file_name FROM files WHERE uploaded = 1 '
+                    'AND deleted = 0 AND time < ? ORDER BY time, file_name',
+                    (cutoff.isoformat(' '),))])
+
+
+    def MarkUploaded(self, file_hashes):
+        """Record uploaded files
+        Parameters:
+            file_hashes (dict): {file_name: hash of the uploaded object}.
+        Returns:
+            None
+        """
+        self.conn.executemany('UPDATE files SET uploaded = 1, hash = ? '
+                              'WHERE file_name = ?',
+                              [(y, x) for x, y in file_hashes.items()])
+        self.conn.commit()
+
+
+    def MarkDeleted(self, file_list):
+        """Record deleted files
+        Parameters:
+            file_list (list(str)): file names.
+        Returns:
+            None
+        """
+        self.conn.executemany('UPDATE files SET deleted = 1 '
+                              'WHERE file_name = ?',
+                              [(x,) for x in file_list])
+        self.conn.commit()
+
+
+    def Close(self):
+        """Close the index
+        Returns:
+            None
+        """
+        self.conn.close()
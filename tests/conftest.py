@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 00:20:33 2026
+
+@author: Jian Cao
+
+Fixtures shared by the tests
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import pytest
+
+## Define helpers -------------------------------------------------------------
+class Interrupted(Exception):
+    pass
+
+
+## Define fixtures ------------------------------------------------------------
+@pytest.fixture
+def source_path(tmp_path):
+    return(str(tmp_path) + '/')
+
+
+@pytest.fixture
+def write_file(source_path):
+    # write size random bytes to source_path + file_name, returns them
+    def write(file_name, size):
+        data = os.urandom(size)
+        with open(source_path + file_name, 'wb') as file:
+            file.write(data)
+        return(data)
+    return(write)
+
+
+@pytest.fixture
+def interrupt():
+    # interrupt(owner, name, is_chunk, fail_at, upload) replaces the
+    # owner.name request function so its fail_at-th chunk raises, then
+    # runs upload(), as if the process had stopped there
+    def run(owner, name, is_chunk, fail_at, upload):
+        send = getattr(owner, name)
+        chunks = []
+
+        def failing_send(*args, **options):
+            if is_chunk(*args, **options):
+                chunks.append(args)
+                if len(chunks) == fail_at:
+                    raise Interrupted()
+            return(send(*args, **options))
+
+        setattr(owner, name, failing_send)
+        with pytest.raises(Interrupted):
+            upload()
+    return(run)
+
+
+@pytest.fixture
+def gcs_bucket():
+    # bucket of the Cloud Storage emulator, the test is skipped without it
+    if not os.environ.get('STORAGE_EMULATOR_HOST'):
+        pytest.skip('STORAGE_EMULATOR_HOST is not set')
+    return(os.environ.get('GCS_TEST_BUCKET', 'testbucket'))
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:05:12 2026
+
+@author: Jian Cao
+
+Tests of ConnectGoogleDrive.UploadFile against the fake Drive server,
+including the resume of an interrupted resumable upload
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from fake_drive_server import FakeDrive
+from spike.DataTools import ConnectGoogleDrive
+
+## Define helpers -------------------------------------------------------------
+@pytest.fixture
+def drive(monkeypatch):
+    drive = FakeDrive()
+    drive.folder_id = drive.AddItem('uploads', None, folder = True)
+    monkeypatch.setenv('DRIVE_EMULATOR_HOST',
+                       'http://127.0.0.1:{}'.format(drive.Start()))
+    yield drive
+    drive.Stop()
+
+
+def upload(drive, source_path, file_name, google_drive = None):
+    # 256 KB chunks for files over 1 MB
+    google_drive = google_drive or ConnectGoogleDrive(None)
+    return(google_drive.UploadFile(source_path, drive.folder_id, file_name,
+                                   chunk_mb = 0.25, multipart_mb = 1))
+
+
+def interrupt_upload(interrupt, drive, source_path, file_name):
+    # stop the upload at its 4th chunk
+    google_drive = ConnectGoogleDrive(None)
+    interrupt(google_drive._http(), 'request',
+              lambda uri, method = 'GET', **options: (
+                  method == 'PUT' and 'upload_id' in uri),
+              4, lambda: upload(drive, source_path, file_name, google_drive))
+
+
+def uploaded(drive, file_name):
+    return([bytes(x['data']) for x in drive.items.values()
+            if x['name'] == file_name])
+
+
+## Define tests ---------------------------------------------------------------
+def test_small_file_is_sent_in_one_request(drive, source_path, write_file):
+    data = write_file('small.json', 100000)
+    requests = drive.requests
+    response = upload(drive, source_path, 'small.json')
+    assert response['name'] == 'small.json'
+    assert drive.requests - requests == 1
+    assert uploaded(drive, 'small.json') == [data]
+
+
+def test_large_file_is_sent_in_chunks(drive, source_path, write_file):
+    data = write_file('large.zip', 3 * 1048576)
+    upload(drive, source_path, 'large.zip')
+    assert uploaded(drive, 'large.zip') == [data]
+    assert len(drive.sessions) == 1
+    # the session is removed once the upload is finished
+    assert os.listdir(source_path + '.upload_sessions/') == []
+
+
+def test_interrupted_upload_resumes(drive, source_path, write_file,
+                                    interrupt, capsys):
+    data = write_file('large.zip', 3 * 1048576)
+    interrupt_upload(interrupt, drive, source_path, 'large.zip')
+    # no session file next to the uploaded files
+    assert sorted(os.listdir(source_path)) == ['.upload_sessions',
+                                               'large.zip']
+    assert os.listdir(source_path + '.upload_sessions/') == [
+               'large.zip.json']
+    capsys.readouterr()
+    upload(drive, source_path, 'large.zip') # a new client
+    assert 'Resuming upload from 786432 bytes.' in capsys.readouterr().out
+    assert len(drive.sessions) == 1
+    assert uploaded(drive, 'large.zip') == [data]
+    assert os.listdir(source_path + '.upload_sessions/') == []
+
+
+def test_changed_file_starts_new_session(drive, source_path, write_file,
+                                         interrupt, capsys):
+    write_file('large.zip', 3 * 1048576)
+    interrupt_upload(interrupt, drive, source_path, 'large.zip')
+    data = write_file('large.zip', 2 * 1048576)
+    capsys.readouterr()
+    upload(drive, source_path, 'large.zip')
+    assert 'Resuming' not in capsys.readouterr().out
+    assert len(drive.sessions) == 2
+    assert uploaded(drive, 'large.zip') == [data]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:05:41 2026
+
+@author: Jian Cao
+
+Tests of ConnectGoogleCloudStorage.DownloadFolder, run against a Cloud
+Storage emulator given by STORAGE_EMULATOR_HOST and GCS_TEST_BUCKET
+"""
+
+## Set environment ------------------------------------------------------------
+import importlib
+from spike.DataTools import ConnectGoogleCloudStorage
+
+gcs = importlib.import_module('spike.DataTools.ConnectGoogleCloudStorage')
+
+## Define tests ---------------------------------------------------------------
+def test_unverifiable_ranges_are_kept(monkeypatch, gcs_bucket, source_path,
+                                      write_file, capsys):
+    # a composite object has a crc32c only, without google_crc32c there
+    # is no checksum to compare
+    data = write_file('composite.zip', 2 * 1048576)
+    storage = ConnectGoogleCloudStorage(None)
+    storage.UploadFile(gcs_bucket, source_path, 'composite.zip',
+                       bucket_folder = 'download/', composite_mb = 1,
+                       composite_parts = 4)
+    list_blobs = storage.client.list_blobs
+
+    def composite_blobs(*args, **options):
+        # the emulator adds an md5 to composite objects, GCS does not
+        for blob in list_blobs(*args, **options):
+            blob._properties.pop('md5Hash', None)
+            yield blob
+
+    monkeypatch.setattr(storage.client, 'list_blobs', composite_blobs)
+    monkeypatch.setattr(gcs, 'google_crc32c', None)
+    capsys.readouterr()
+    summary = storage.DownloadFolder(gcs_bucket, source_path + 'download/',
+                                     bucket_folder = 'download/',
+                                     range_mb = 0.5)
+    assert 'download/composite.zip, it is not verified.' in (
+               capsys.readouterr().out)
+    assert summary['failed'] == []
+    assert summary['files'] == 1
+    with open(source_path + 'download/composite.zip', 'rb') as file:
+        assert file.read() == data
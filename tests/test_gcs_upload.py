@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:40:26 2026
+
+@author: Jian Cao
+
+Tests of the resumable ConnectGoogleCloudStorage.UploadFile, run against a
+Cloud Storage emulator given by STORAGE_EMULATOR_HOST and GCS_TEST_BUCKET
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import json
+import base64
+import hashlib
+from spike.DataTools import ConnectGoogleCloudStorage
+
+## Define helpers -------------------------------------------------------------
+def upload(bucket, source_path, file_name, storage = None):
+    storage = storage or ConnectGoogleCloudStorage(None)
+    return(storage.UploadFile(bucket, source_path, file_name,
+                              bucket_folder = 'tests/', chunk_mb = 0.25))
+
+
+def interrupt_upload(interrupt, bucket, source_path, file_name):
+    # stop the upload at its 4th chunk, every PUT is a chunk
+    storage = ConnectGoogleCloudStorage(None)
+    interrupt(storage.client._http, 'put', lambda *args, **options: True,
+              4, lambda: upload(bucket, source_path, file_name, storage))
+
+
+## Define tests ---------------------------------------------------------------
+def test_interrupted_upload_resumes(gcs_bucket, source_path, write_file,
+                                    interrupt, capsys):
+    data = write_file('resume.zip', 2 * 1048576)
+    interrupt_upload(interrupt, gcs_bucket, source_path, 'resume.zip')
+    with open(source_path + '.upload_sessions/resume.zip.json') as file:
+        session = json.load(file)
+    assert session['source']['blob'] == 'tests/resume.zip'
+    capsys.readouterr()
+    md5 = upload(gcs_bucket, source_path, 'resume.zip')
+    assert ('Resuming tests/resume.zip from byte 786432.' in
+            capsys.readouterr().out)
+    # the returned hash is the verified md5 of the object
+    assert md5 == base64.b64encode(hashlib.md5(data).digest()).decode()
+    assert not os.path.isfile(source_path +
+                              '.upload_sessions/resume.zip.json')
+
+
+def test_changed_file_starts_new_session(gcs_bucket, source_path,
+                                         write_file, interrupt, capsys):
+    write_file('changed.zip', 2 * 1048576)
+    interrupt_upload(interrupt, gcs_bucket, source_path, 'changed.zip')
+    data = write_file('changed.zip', 1048576 + 1000)
+    capsys.readouterr()
+    upload(gcs_bucket, source_path, 'changed.zip')
+    assert 'Resuming' not in capsys.readouterr().out
+    blob = ConnectGoogleCloudStorage(None).client.bucket(gcs_bucket).blob(
+               'tests/changed.zip')
+    assert blob.download_as_bytes() == data
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:30:14 2026
+
+@author: Jian Cao
+
+Tests of the raw mode of the ConnectTwitterAPI stream
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import sys
+import pytest
+from TwitterAPI import TwitterRequestError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from benchmark_raw_stream import FakeTwitterAPI, FakePipe, make_line
+from spike.TwitterMonitor import ConnectTwitterAPI
+
+## Define helpers -------------------------------------------------------------
+def connect(tmp_path, twitter_api):
+    connection = ConnectTwitterAPI('key', 'secret', 'token', 'secret')
+    connection.input_dict = {'raw': True,
+                             'transport': 'batch',
+                             'batch_size': 10,
+                             'batch_seconds': 3600,
+                             'keywords': ['covid19'],
+                             'file_prefix': 'test',
+                             'download_path': str(tmp_path) + '/'}
+    connection.api_type = 'stream_v1'
+    connection.outlet_type = 'local'
+    connection._get_ready()
+    connection.twitter_api = twitter_api
+    connection.pipe_in = FakePipe()
+    return(connection)
+
+
+## Define tests ---------------------------------------------------------------
+def test_raw_stream_forwards_lines(tmp_path):
+    lines = [make_line(i) for i in range(25)]
+    connection = connect(tmp_path, FakeTwitterAPI(lines))
+    connection._start_sender()
+    assert connection._request_stream_v1()
+    connection._send_finished()
+    tweets = []
+    for batch in connection.pipe_in.messages[:-1]: # last is FINISHED
+        tweets += batch
+    assert tweets == lines
+
+
+@pytest.mark.parametrize('status_code', [401, 420, 503])
+def test_raw_stream_raises_on_error_status(tmp_path, status_code):
+    # as TwitterAPI does in decoded mode, so the collector backs off
+    connection = connect(tmp_path, FakeTwitterAPI(
+                             [make_line(0)], status_code,
+                             'Exceeded connection limit for user'))
+    with pytest.raises(TwitterRequestError) as error:
+        connection._request_stream_v1()
+    assert error.value.status_code == status_code
+    assert connection.pipe_in.messages == []
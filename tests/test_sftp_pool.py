@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:40:52 2026
+
+@author: Jian Cao
+
+Tests of the ConnectSFTP session pool against a local pyftpdlib server
+"""
+
+## Set environment ------------------------------------------------------------
+import time
+import logging
+import threading
+import pytest
+
+pytest.importorskip('pyftpdlib')
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import FTPServer
+from spike.DataTools import ConnectSFTP
+
+## Define helpers -------------------------------------------------------------
+@pytest.fixture
+def server(tmp_path):
+    # plain FTP server that drops sessions idle for 1 s, counts logins
+    authorizer = DummyAuthorizer()
+    authorizer.add_user('user', 'passwd', str(tmp_path), perm = 'elradfmw')
+
+    class Handler(FTPHandler):
+        logins = 0
+
+        def on_login(self, username):
+            Handler.logins += 1
+
+    Handler.authorizer = authorizer
+    Handler.timeout = 1
+    logging.getLogger('pyftpdlib').setLevel(logging.WARNING)
+    ftp_server = FTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target = ftp_server.serve_forever,
+                     kwargs = {'timeout': 0.1, 'handle_exit': False},
+                     daemon = True).start()
+    ftp_server.handler = Handler
+    yield ftp_server
+    ftp_server.close_all()
+
+
+def connect(server, keepalive):
+    return(ConnectSFTP('127.0.0.1', 'user', 'passwd',
+                       sftp_port = server.address[1], use_tls = False,
+                       keepalive = keepalive, cache_ttl = 0))
+
+
+## Define tests ---------------------------------------------------------------
+def test_idle_session_is_kept_alive(server):
+    sftp = connect(server, 0.4)
+    time.sleep(2.5) # past the idle timeout of the server
+    assert sftp.ListFiles('/') == []
+    assert server.handler.logins == 1
+    sftp.Close()
+
+
+def test_lost_session_is_replaced(server):
+    sftp = connect(server, 0)
+    time.sleep(2.5)
+    assert sftp.ListFiles('/') == []
+    assert server.handler.logins == 2
+    sftp.Close()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:20:37 2026
+
+@author: Jian Cao
+
+Tests of the pipeline mode of SyncFolderToCloudStorage over several passes
+"""
+
+## Set environment ------------------------------------------------------------
+import os
+import importlib
+import pytest
+
+sync = importlib.import_module('spike.TwitterMonitor.SyncFolderToCloudStorage')
+
+TIME_POS = [7, 26]
+
+## Define helpers -------------------------------------------------------------
+class StopSync(Exception):
+    pass
+
+
+class FakeStorage:
+    # records the uploaded files instead of sending them
+    POOL_SIZE = 10
+    uploads = []
+
+    def __init__(self, token_path, pool_size = None):
+        pass
+
+    def UploadFile(self, bucket_name, source_path, file_name,
+                   bucket_folder = None, **options):
+        FakeStorage.uploads.append(file_name)
+        return('hash-' + file_name)
+
+    def ConnectionStats(self):
+        return({'requests': 0, 'connections': 0, 'reuse': 0})
+
+
+def make_raw_files(folder, start, n_files):
+    for i in range(start, start + n_files):
+        file_name = 'tweets-2021-01-01-00-00-{:02d}-0.txt'.format(i)
+        with open(os.path.join(folder, file_name), 'w') as file:
+            file.write('tweet {}\n'.format(i) * 100)
+
+
+def run_passes(monkeypatch, tmp_path, n_passes, between = None, **options):
+    source_path = str(tmp_path / 'raw') + '/'
+    zip_path = str(tmp_path / 'zip') + '/'
+    os.makedirs(source_path, exist_ok = True)
+    os.makedirs(zip_path, exist_ok = True)
+    passes = []
+
+    def sleep(seconds):
+        # every pass ends with a sleep, stop after n_passes
+        passes.append(seconds)
+        if between:
+            between(len(passes), source_path)
+        if len(passes) >= n_passes:
+            raise StopSync()
+
+    FakeStorage.uploads = []
+    monkeypatch.setattr(sync, 'ConnectGoogleCloudStorage', FakeStorage)
+    monkeypatch.setattr(sync.time, 'sleep', sleep)
+    make_raw_files(source_path, 0, 6)
+    with pytest.raises(StopSync):
+        sync.SyncFolderToCloudStorage(source_path, zip_path, 'token',
+                                      'bucket', TIME_POS,
+                                      bucket_folder = 'tweets/',
+                                      zip_type = 'zip', zip_workers = 2,
+                                      wait_retry = 0, wait_next = 0,
+                                      **options)
+    return(FakeStorage.uploads)
+
+
+## Define tests ---------------------------------------------------------------
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_kept_raw_files_are_uploaded_once(monkeypatch, tmp_path, pipeline):
+    uploads = run_passes(monkeypatch, tmp_path, 3, remove_raw = False,
+                         pipeline = pipeline)
+    assert sorted(uploads) == sorted(set(uploads))
+    assert len(uploads) == 6
+
+
+def test_new_raw_files_are_uploaded_in_later_passes(monkeypatch, tmp_path):
+    def between(n_pass, source_path):
+        if n_pass == 1:
+            make_raw_files(source_path, 6, 3)
+
+    uploads = run_passes(monkeypatch, tmp_path, 3, between = between,
+                         remove_raw = False, pipeline = True)
+    assert len(uploads) == 9
+    assert len(set(uploads)) == 9
+
+
+def test_pipeline_skips_raw_files_up_to_marker(monkeypatch, tmp_path):
+    marker = 'tweets-2021-01-01-00-00-02-0.zip'
+    uploads = run_passes(monkeypatch, tmp_path, 2, remove_raw = False,
+                         pipeline = True, marker = marker)
+    assert sorted(uploads) == ['tweets-2021-01-01-00-00-{:02d}-0.zip'.format(i)
+                               for i in range(3, 6)]
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_deleted_zip_files_are_not_rebuilt(monkeypatch, tmp_path, pipeline):
+    zip_counts = []
+
+    def between(n_pass, source_path):
+        zip_counts.append(len(os.listdir(str(tmp_path / 'zip'))))
+
+    uploads = run_passes(monkeypatch, tmp_path, 3, between = between,
+                         remove_raw = False, pipeline = pipeline,
+                         delete_after_days = 0)
+    assert zip_counts == [0, 0, 0]
+    assert len(uploads) == 6